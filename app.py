@@ -1,13 +1,23 @@
-import os
-import base64
+import json
 import logging
-import requests
-from fastapi import FastAPI, HTTPException, Depends
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Query, Header
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from models import GithubConfig, LeetcodeSolution, ProblemDetails, Explanation
-from utils import get_file_extension, get_folder_and_filename, create_solution_file, create_notes
-from llm import llm, problem_prompt, problem_parser, explanation_prompt, explanation_parser
+from models import GithubConfig, LeetcodeSolution
+from llm import LLM_MODEL, get_llm, model_registry
+from llm_cache import get_llm_cache
+from rate_limit import limiter_stats
+from config_store import DEFAULT_SESSION, get_config_store, session_hash
+from metrics import CONTENT_TYPE, render_metrics
+from github_client import GithubClient, close_http_client
+from commit_builder import make_builder
+from pipeline import StageError, process_submission, stream_submission, fill_note_section
+from notes import NOTE_SECTIONS, NoteNotFoundError
+from jobs import JobQueue, WorkerPool
+from batch import BATCH_CONCURRENCY, process_batch, iter_lines, iter_upload
 
 # LOGGING SETUP
 logging.basicConfig(
@@ -16,8 +26,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# JOB QUEUE
+async def run_save_solution_job(job: dict, stages: dict) -> dict:
+    solution = LeetcodeSolution(**job["payload"]["solution"])
+    # Payloads only name the session; the token stays in the config store
+    github_config = get_config_store().get(job["payload"]["session"])
+    if not github_config:
+        raise RuntimeError("GitHub configuration for this session was removed")
+    builder = make_builder(github_config)
+    result = await process_submission(get_llm(), solution, builder, stages)
+    logger.info(f"🎉 Solution saved successfully!")
+    return result
+
+job_queue = JobQueue()
+worker_pool = WorkerPool(job_queue, run_save_solution_job)
+
 # FASTAPI SETUP
-app = FastAPI(title="LeetCode GitHub Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker_pool.start()
+    yield
+    await worker_pool.stop()
+    await close_http_client()
+
+app = FastAPI(title="LeetCode GitHub Agent API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,144 +60,196 @@ app.add_middleware(
 )
 
 # GITHUB CONFIG
-github_config = {}
+def session_id(
+    x_session_id: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None)
+) -> str:
+    """Session from X-Session-ID or an Authorization bearer token; clients sending neither share one"""
+    if x_session_id:
+        return x_session_id
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return DEFAULT_SESSION
+
+def session_config(session: str = Depends(session_id)) -> dict:
+    return get_config_store().get(session_hash(session)) or {}
+
+def require_config(config: dict = Depends(session_config)) -> dict:
+    if not config:
+        raise HTTPException(status_code=400, detail="GitHub not configured. Call /configure-github first")
+    return config
 
 # ROUTES
 @app.post("/configure-github")
-async def configure_github(config: GithubConfig):
-    global github_config
-    github_config = config.dict()
-
-    headers = {
-        "Authorization": f"token {config.github_token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+async def configure_github(config: GithubConfig, session: str = Depends(session_id)):
+    store = get_config_store()
+
+    if config.backend == "local":
+        from local_git import LOCAL_GIT_ROOT, get_local_repo, LocalGitError
+        if not LOCAL_GIT_ROOT:
+            # Without a root any caller could have the server create and push repos anywhere
+            raise HTTPException(status_code=403, detail="Local backend is disabled. Set LOCAL_GIT_ROOT to enable it")
+        try:
+            repo = get_local_repo(config.local_path)
+        except (OSError, ValueError, LocalGitError) as e:
+            raise HTTPException(status_code=400, detail=f"Local repository unavailable: {e}")
+        store.put(session_hash(session), {**config.dict(), "local_path": repo.path})
+        logger.info(f"✅ Local repository ready: {repo.path}")
+        return {"status": "success", "user": config.github_username, "message": f"Committing to {repo.path}"}
+
+    client = GithubClient(config.github_token)
 
     try:
-        r = requests.get("https://api.github.com/user", headers=headers)
+        r = await client.get_user()
         if r.status_code == 200:
+            store.put(session_hash(session), config.dict())
             user = r.json().get("login")
             logger.info(f"✅ GitHub connected: {user}")
             return {"status": "success", "user": user, "message": f"Connected as {user}"}
         else:
             raise HTTPException(status_code=401, detail="Invalid GitHub token.")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/save-solution")
-async def save_solution(solution: LeetcodeSolution = Depends(LeetcodeSolution.as_form)):
-    if not github_config:
-        raise HTTPException(status_code=400, detail="GitHub not configured. Call /configure-github first")
-
-    headers = {
-        "Authorization": f"token {github_config['github_token']}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
-    try:
-        logger.info("🔍 Extracting problem details...")
-        problem = problem_prompt | llm | problem_parser
-        problem_details: ProblemDetails = problem.invoke(
-            {"problem_statement": solution.problem_statement}
-        )
-        logger.info(f"✅ Problem extracted: {problem_details.problem_name}")
-    except Exception as e:
-        logger.error(f"❌ Problem parsing error: {e}")
-        raise HTTPException(500, f"Failed to extract problem details: {e}")
-
-    try:
-        logger.info("📝 Generating explanation...")
-        explain = explanation_prompt | llm | explanation_parser
-        explanation: Explanation = explain.invoke({
-            "problem_statement": solution.problem_statement,
-            "code": solution.code,
-            "language": solution.language
-        })
-        logger.info("✅ Explanation generated")
-    except Exception as e:
-        logger.error(f"❌ Explanation parsing error: {e}")
-        raise HTTPException(500, f"Failed to generate explanation: {e}")
-
-    # Get folder and filename
-    extension = get_file_extension(solution.language)
-    folder, filename = get_folder_and_filename(
-        problem_details.problem_number,
-        problem_details.problem_name,
-        extension
+@app.delete("/configure-github")
+async def disconnect_github(session: str = Depends(session_id)):
+    get_config_store().delete(session_hash(session))
+    return {"status": "success", "message": "GitHub configuration removed"}
+
+@app.post("/save-solution", status_code=202)
+async def save_solution(
+    solution: LeetcodeSolution = Depends(LeetcodeSolution.as_form),
+    github_config: dict = Depends(require_config),
+    session: str = Depends(session_id)
+):
+    job_id = worker_pool.submit("save-solution", {
+        "solution": solution.dict(),
+        "session": session_hash(session)
+    }, session_hash(session))
+    logger.info(f"📥 Queued job {job_id}")
+    return {"status": "queued", "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+@app.post("/save-solution/stream")
+async def save_solution_stream(
+    solution: LeetcodeSolution = Depends(LeetcodeSolution.as_form),
+    github_config: dict = Depends(require_config)
+):
+    """Run the pipeline inline and report progress as server-sent events"""
+    builder = make_builder(github_config)
+
+    async def stream():
+        async for event, data in stream_submission(get_llm(), solution, builder):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    code_file = create_solution_file(solution.code, solution.language)
-    notes_file = create_notes(problem_details, explanation)
-
+@app.post("/notes/{problem}/sections/{name}")
+async def add_note_section(
+    problem: str,
+    name: str,
+    language: Optional[str] = None,
+    regenerate: bool = False,
+    github_config: dict = Depends(require_config)
+):
+    """Generate a notes section left out of the note profile and commit it into the .md"""
+    if name not in NOTE_SECTIONS:
+        raise HTTPException(404, f"Unknown notes section {name}; expected one of {', '.join(NOTE_SECTIONS)}")
     try:
-        files_pushed = []
-
-        # CODE FILE
-        code_path = f"solutions/{folder}/{filename}"
-        logger.info(f"📤 Pushing code file: {code_path}")
-        r = requests.put(
-            f"https://api.github.com/repos/{github_config['github_username']}/"
-            f"{github_config['github_repo']}/contents/{code_path}",
-            headers=headers,
-            json={
-                "message": f"Add solution: {problem_details.problem_name} ({solution.language})",
-                "content": base64.b64encode(code_file.encode()).decode(),
-                "branch": "main"
-            }
-        )
-        if r.status_code in (200, 201):
-            files_pushed.append(code_path)
-            logger.info(f"✅ Code file pushed")
-        else:
-            raise HTTPException(500, f"GitHub Code push failed: {r.text}")
-
-        # NOTES FILE
-        notes_filename = filename.replace(f".{extension}", ".md")
-        notes_path = f"solutions/{folder}/{notes_filename}"
-        logger.info(f"📤 Pushing notes file: {notes_path}")
-        r = requests.put(
-            f"https://api.github.com/repos/{github_config['github_username']}/"
-            f"{github_config['github_repo']}/contents/{notes_path}",
-            headers=headers,
-            json={
-                "message": f"Add notes: {problem_details.problem_name}",
-                "content": base64.b64encode(notes_file.encode()).decode(),
-                "branch": "main"
-            }
-        )
-        if r.status_code in (200, 201):
-            files_pushed.append(notes_path)
-            logger.info(f"✅ Notes file pushed")
-        else:
-            raise HTTPException(500, f"GitHub Notes push failed: {r.text}")
-
-        logger.info(f"🎉 Solution saved successfully!")
-        return {
-            "status": "success",
-            "problem": problem_details.dict(),
-            "files_pushed": files_pushed,
-            "folder_structure": f"solutions/{folder}/"
-        }
-
-    except Exception as e:
-        logger.error(str(e))
-        raise HTTPException(500, f"GitHub upload failed: {e}")
+        return await fill_note_section(get_llm(), make_builder(github_config), problem, name, language, regenerate)
+    except NoteNotFoundError as e:
+        raise HTTPException(404, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except StageError as e:
+        logger.error(f"❌ {e.describe()}")
+        raise HTTPException(502, e.describe())
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, session: str = Depends(session_id)):
+    # Another session's job answers 404 as if it didn't exist
+    job = job_queue.get(job_id, session_hash(session))
+    if job is None:
+        raise HTTPException(404, f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    session: str = Depends(session_id)
+):
+    """The caller's session's jobs only"""
+    return {"jobs": job_queue.list(status, limit, session_hash(session))}
+
+@app.post("/save-solutions/batch")
+async def save_solutions_batch(
+    file: UploadFile = File(...),
+    concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=32),
+    github_config: dict = Depends(require_config)
+):
+    """Process a JSONL upload of solutions, streaming one NDJSON result line per record"""
+    builder = make_builder(github_config)
+
+    async def stream():
+        lines = iter_lines(iter_upload(file))
+        async for result in process_batch(lines, get_llm(), builder, concurrency):
+            yield json.dumps(result) + "\n"
+
+    logger.info(f"📦 Batch upload received: {file.filename}")
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @app.get("/health")
 async def health():
     return {
         "status": "ok",
         "message": "LeetCode GitHub Agent API is running",
-        "model": "gemini-2.5-flash-lite"
+        "model": LLM_MODEL
     }
 
+@app.get("/models")
+async def models():
+    """Model, temperature, output cap and timeout per stage, primary tier first"""
+    return model_registry()
+
+@app.get("/cache-stats")
+async def cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/rate-limits")
+async def rate_limits():
+    return limiter_stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of stage, GitHub and LLM metrics"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.post("/flush")
+async def flush(github_config: dict = Depends(session_config)):
+    """Push commits the local backend is still holding back"""
+    if github_config.get("backend") != "local":
+        return {"backend": github_config.get("backend", "github"), "pushed": True, "message": "Nothing to flush"}
+    repo = make_builder(github_config)
+    pushed = await repo.flush()
+    return {"backend": "local", "pushed": pushed, **repo.stats()}
+
 @app.get("/github-status")
-async def github_status():
+async def github_status(github_config: dict = Depends(session_config)):
     if github_config:
         return {
             "configured": True,
             "username": github_config.get('github_username'),
-            "repo": github_config.get('github_repo')
+            "repo": github_config.get('github_repo'),
+            "backend": github_config.get('backend', 'github')
         }
     return {"configured": False, "message": "GitHub not configured yet"}
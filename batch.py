@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+from typing import AsyncIterator, Optional
+from models import LeetcodeSolution
+from pipeline import analyze_solution, render_solution_files, folder_owner, keep_note_sections
+from checkpoints import open_checkpoint
+from notes import profile_sections
+from repo_index import FolderCollisionError, same_problem
+from rate_limit import request_priority, PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into text lines without buffering the whole input"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode()
+    if buffer:
+        yield buffer.decode()
+
+
+async def iter_upload(upload, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(chunk_size):
+        yield chunk
+
+
+async def iter_file(path: str) -> AsyncIterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line
+
+
+async def process_batch(
+    lines: AsyncIterator[str],
+    llm_instance,
+    builder,
+    concurrency: int = BATCH_CONCURRENCY
+) -> AsyncIterator[dict]:
+    """Run JSONL LeetcodeSolution records through the pipeline and commit them once.
+
+    Records are read lazily: a new line is only pulled once one of `concurrency`
+    slots is free. One result dict is yielded per record as it completes, followed
+    by a final summary for the consolidated commit. Each record is checkpointed, so
+    re-running a batch whose commit failed skips the LLM work already done.
+    """
+    results: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+    files = {}
+    problems = []
+    owners = {}
+    checkpoints = []
+
+    async def process_record(line_no: int, raw: str):
+        try:
+            solution = LeetcodeSolution.model_validate_json(raw)
+            checkpoint = open_checkpoint(
+                solution.problem_statement, solution.code, solution.language, solution.problem_name,
+                note_profile=solution.note_profile, fresh=solution.bypass_cache
+            )
+            problem_details, explanation = await analyze_solution(
+                llm_instance,
+                solution.problem_statement,
+                solution.code,
+                solution.language,
+                bypass_cache=solution.bypass_cache,
+                problem_name=solution.problem_name,
+                checkpoint=checkpoint,
+                sections=profile_sections(solution.note_profile)
+            )
+            folder, rendered = render_solution_files(
+                problem_details, explanation, solution.code, solution.language, checkpoint
+            )
+            owner = folder_owner(folder, problem_details)
+            for key, problem in owner.items():
+                # Two records of this batch mapping different problems to one folder
+                if key in owners and not same_problem(owners[key], problem):
+                    raise FolderCollisionError(key, owners[key], problem)
+            files.update(rendered)
+            owners.update(owner)
+            if checkpoint:
+                checkpoints.append(checkpoint)
+            problems.append(problem_details.problem_name)
+            result = {
+                "line": line_no,
+                "status": "success",
+                "problem": problem_details.problem_name,
+                "folder_structure": f"solutions/{folder}/",
+                "files": list(rendered)
+            }
+        except Exception as e:
+            logger.error(f"❌ Batch record {line_no} failed: {e}")
+            result = {"line": line_no, "status": "error", "error": str(e)}
+        finally:
+            slots.release()
+        await results.put(result)
+
+    async def feed():
+        tasks = set()
+        line_no = 0
+        try:
+            # Record tasks inherit this context, so their LLM and GitHub calls queue behind interactive ones
+            with request_priority(PRIORITY_BATCH):
+                async for raw in lines:
+                    line_no += 1
+                    if not raw.strip():
+                        continue
+                    await slots.acquire()
+                    task = asyncio.create_task(process_record(line_no, raw))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+        finally:
+            await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await feeder
+    finally:
+        feeder.cancel()
+
+    if not files:
+        yield {"status": "empty", "message": "No records processed successfully, nothing committed"}
+        return
+
+    try:
+        logger.info(f"📤 Committing {len(files)} files from {len(problems)} solutions")
+        with request_priority(PRIORITY_BATCH):
+            message = f"Add {len(problems)} solutions (batch)"
+            commit = await builder.commit_files(await keep_note_sections(builder, files), message, owners)
+        for checkpoint in checkpoints:
+            checkpoint.clear()
+        yield {
+            "status": "committed",
+            "commit_sha": commit["commit_sha"],
+            "solutions": len(problems),
+            "files": len(commit["files"]),
+            "unchanged": len(commit["unchanged"])
+        }
+    except Exception as e:
+        logger.error(f"❌ Batch commit failed: {e}")
+        yield {"status": "error", "error": f"GitHub upload failed: {e}"}
+
+
+async def _main(args) -> int:
+    from llm import get_llm
+    from github_client import close_http_client
+    from commit_builder import make_builder
+
+    llm = get_llm()
+    if llm is None:
+        print("GOOGLE_API_KEY is not set", file=sys.stderr)
+        return 1
+
+    builder = make_builder({
+        "github_token": args.token,
+        "github_username": args.username,
+        "github_repo": args.repo,
+        "backend": "local" if args.local_path else "github",
+        "local_path": args.local_path
+    })
+    failed = False
+    try:
+        async for result in process_batch(iter_file(args.path), llm, builder, args.concurrency):
+            failed = failed or result["status"] == "error"
+            print(json.dumps(result), flush=True)
+        if args.local_path and not await builder.flush():
+            failed = True
+    finally:
+        await close_http_client()
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Push a JSONL file of LeetCode solutions in one commit")
+    parser.add_argument("path", help="JSONL file with one LeetcodeSolution object per line")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--token", default=os.getenv("GITHUB_TOKEN"))
+    parser.add_argument("--username", default=os.getenv("GITHUB_USERNAME"))
+    parser.add_argument("--repo", default=os.getenv("GITHUB_REPO", "leetcode-solutions"))
+    parser.add_argument(
+        "--local-path",
+        help="Commit into this local clone or bare repo (created if missing) instead of the GitHub API"
+    )
+    args = parser.parse_args(argv)
+
+    if args.local_path:
+        args.username = args.username or "local"
+    elif not args.token or not args.username:
+        parser.error("GitHub token and username are required (--token/--username or GITHUB_TOKEN/GITHUB_USERNAME)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s", stream=sys.stderr)
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""Local stand-ins for Gemini and GitHub used by the replay benchmark.
+
+FakeLLM is a LangChain chat model that sleeps for a sampled latency and answers each
+pipeline prompt with canned JSON. The fake GitHub app implements the subset of the
+contents and Git Data APIs the pipeline uses, keeping one in-memory repository per
+owner/repo, with an optional per-request latency.
+"""
+import re
+import json
+import math
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# LATENCY DISTRIBUTIONS
+def latency_sampler(spec: str, seed: Optional[int] = None) -> Callable[[], float]:
+    """Parse "fixed:S", "uniform:LO,HI", "normal:MEAN,SD" or "lognormal:MEDIAN,SIGMA" (seconds)"""
+    rng = random.Random(seed)
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+
+# FAKE LLM
+_TITLE_RE = re.compile(r"^\s*(\d+)\.\s+(.+?)\s*$", re.MULTILINE)
+_TAGS = [["Array", "Hash Table"], ["String", "Two Pointers"], ["Dynamic Programming"], ["Graph", "Breadth-First Search"]]
+_DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+EXPLANATION = {
+    "explanation": "Walk the input once while remembering what has been seen so far. " * 3,
+    "key_insights": ["Trade memory for time with a lookup table", "One pass is enough", "Check before inserting"],
+    "hints": [f"**Hint {i}:** think about what you need to remember at each step" for i in range(1, 6)],
+    "algorithm": "1. Create an empty map\n2. For each element\n   a. Look up its complement\n   b. Record it\n3. Return",
+    "approach": ["Initialise the map", "Scan the input", "Return the answer as soon as it is found"],
+    "walkthrough": "| Step | Value | Map |\n|---|---|---|\n" + "\n".join(f"| {i} | {i * 2} | {{...}} |" for i in range(6)),
+    "time_complexity": "O(n) - each element is visited once and map operations are O(1) on average.",
+    "space_complexity": "O(n) - the map holds up to n entries.",
+    "edge_cases": ["Empty input", "Duplicates", "Negative numbers", "Single element"]
+}
+
+
+def _problem_title(text: str) -> tuple:
+    # The statement follows the prompt's first blank line; the rules after it are numbered too
+    body = text.split("\n\n", 1)[-1]
+    match = _TITLE_RE.search(body)
+    return (int(match.group(1)), match.group(2)) if match else (None, "Benchmark Problem")
+
+
+def canned_response(prompt: str) -> str:
+    """Answer a pipeline prompt the way Gemini would, keyed on its opening lines"""
+    number, name = _problem_title(prompt)
+    index = number or 0
+    fields = {}
+    if "Classify this problem statement" in prompt:
+        fields.update({
+            "problem_name": name,
+            "difficulty": _DIFFICULTIES[index % 3],
+            "tags": _TAGS[index % len(_TAGS)],
+            "input_description": "An array of integers and a target value.",
+            "output_description": "The indices of the two numbers adding up to the target."
+        })
+    elif "Extract and structure data" in prompt:
+        fields.update({
+            "problem_number": number,
+            "problem_name": name,
+            "difficulty": _DIFFICULTIES[index % 3],
+            "tags": _TAGS[index % len(_TAGS)],
+            "original_statement": f"Solve **{name}**.\n\n### Example 1\n- **Input:** `x = 1`\n- **Output:** `1`",
+            "input_description": "An integer x.",
+            "output_description": "The answer for x.",
+            "examples": [{"input": "x = 1", "output": "1"}]
+        })
+    # The single-call prompts ask for the problem fields and the explanation together
+    if "coding educator" in prompt:
+        fields.update(EXPLANATION)
+    if fields:
+        return json.dumps(fields)
+    if "polyglot programmer" in prompt:
+        return "class Solution {\n    public int solve(int x) {\n        return x;\n    }\n}\n"
+    return "A short answer from the fake model."
+
+
+class FakeLLM(BaseChatModel):
+    """Chat model that waits `latency()` seconds, then returns canned_response(prompt)"""
+    latency: Any = None
+    model: str = "fake-gemini"
+    temperature: float = 0.2
+    chunk_size: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _delay(self) -> float:
+        return self.latency() if self.latency else 0.0
+
+    @staticmethod
+    def _text(messages) -> str:
+        content = messages[-1].content
+        return content if isinstance(content, str) else str(content)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay())
+        message = AIMessage(content=canned_response(self._text(messages)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        message = AIMessage(content=canned_response(self._text(messages)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay())
+        text = canned_response(self._text(messages))
+        for i in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.chunk_size]))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        text = canned_response(self._text(messages))
+        for i in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.chunk_size]))
+
+
+# FAKE GITHUB
+def _blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _object_sha(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+class FakeRepo:
+    """Blobs, flat trees ({path: blob sha}), commits and branch refs of one repository"""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}
+        self.commits: Dict[str, dict] = {}
+        self.refs: Dict[str, str] = {}
+
+    def tree_of(self, ref: str) -> Optional[Dict[str, str]]:
+        commit = self.refs.get(ref, ref)
+        if commit not in self.commits:
+            return None
+        return self.trees[self.commits[commit]["tree"]]
+
+    def put_tree(self, tree: Dict[str, str]) -> str:
+        sha = _object_sha(tree)
+        self.trees[sha] = tree
+        return sha
+
+
+def create_fake_github(latency: Optional[Callable[[], float]] = None) -> FastAPI:
+    fake = FastAPI()
+    repos: Dict[tuple, FakeRepo] = {}
+    fake.state.repos = repos
+
+    def repo(owner: str, name: str) -> FakeRepo:
+        return repos.setdefault((owner, name), FakeRepo())
+
+    def not_found(message: str = "Not Found"):
+        return JSONResponse({"message": message}, 404)
+
+    @fake.middleware("http")
+    async def simulate_latency(request, call_next):
+        if latency:
+            await asyncio.sleep(latency())
+        return await call_next(request)
+
+    @fake.get("/user")
+    async def user():
+        return {"login": "benchmark"}
+
+    @fake.post("/repos/{owner}/{name}/git/blobs")
+    async def create_blob(owner: str, name: str, request: Request):
+        data = base64.b64decode((await request.json())["content"])
+        sha = _blob_sha(data)
+        repo(owner, name).blobs[sha] = data
+        return JSONResponse({"sha": sha}, 201)
+
+    @fake.get("/repos/{owner}/{name}/git/blobs/{sha}")
+    async def get_blob(owner: str, name: str, sha: str):
+        data = repo(owner, name).blobs.get(sha)
+        if data is None:
+            return not_found()
+        return {"sha": sha, "encoding": "base64", "content": base64.b64encode(data).decode()}
+
+    @fake.get("/repos/{owner}/{name}/git/ref/heads/{branch:path}")
+    async def get_ref(owner: str, name: str, branch: str, request: Request):
+        r = repo(owner, name)
+        if branch not in r.refs:
+            return not_found()
+        etag = f'"{r.refs[branch]}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        return JSONResponse({"ref": f"refs/heads/{branch}", "object": {"sha": r.refs[branch]}}, headers={"ETag": etag})
+
+    @fake.get("/repos/{owner}/{name}/git/commits/{sha}")
+    async def get_commit(owner: str, name: str, sha: str):
+        commit = repo(owner, name).commits.get(sha)
+        if commit is None:
+            return not_found()
+        return {"sha": sha, "tree": {"sha": commit["tree"]}}
+
+    @fake.post("/repos/{owner}/{name}/git/trees")
+    async def create_tree(owner: str, name: str, request: Request):
+        body = await request.json()
+        r = repo(owner, name)
+        tree = dict(r.trees.get(body.get("base_tree"), {}))
+        for entry in body["tree"]:
+            if entry.get("sha") is None:
+                tree.pop(entry["path"], None)
+            else:
+                tree[entry["path"]] = entry["sha"]
+        return JSONResponse({"sha": r.put_tree(tree)}, 201)
+
+    @fake.get("/repos/{owner}/{name}/git/trees/{ref:path}")
+    async def get_tree(owner: str, name: str, ref: str, request: Request):
+        r = repo(owner, name)
+        if not r.refs:
+            return JSONResponse({"message": "Git Repository is empty."}, 409)
+        tree = r.tree_of(ref)
+        if tree is None:
+            return not_found()
+        etag = f'W/"{_object_sha(tree)}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        entries = [{"path": p, "mode": "100644", "type": "blob", "sha": s} for p, s in tree.items()]
+        return JSONResponse({"truncated": False, "tree": entries}, headers={"ETag": etag})
+
+    @fake.post("/repos/{owner}/{name}/git/commits")
+    async def create_commit(owner: str, name: str, request: Request):
+        body = await request.json()
+        body["created_at"] = time.time()
+        sha = _object_sha(body)
+        repo(owner, name).commits[sha] = body
+        return JSONResponse({"sha": sha}, 201)
+
+    @fake.patch("/repos/{owner}/{name}/git/refs/heads/{branch:path}")
+    async def update_ref(owner: str, name: str, branch: str, request: Request):
+        body = await request.json()
+        r = repo(owner, name)
+        commit = r.commits.get(body["sha"])
+        if commit is None or branch not in r.refs:
+            return JSONResponse({"message": "Reference does not exist"}, 422)
+        if commit["parents"] != [r.refs[branch]] and not body.get("force"):
+            return JSONResponse({"message": "Update is not a fast forward"}, 422)
+        r.refs[branch] = body["sha"]
+        return {"ref": f"refs/heads/{branch}", "object": {"sha": body["sha"]}}
+
+    @fake.post("/repos/{owner}/{name}/git/refs")
+    async def create_ref(owner: str, name: str, request: Request):
+        body = await request.json()
+        branch = body["ref"].split("/", 2)[2]
+        r = repo(owner, name)
+        if branch in r.refs:
+            return JSONResponse({"message": "Reference already exists"}, 422)
+        r.refs[branch] = body["sha"]
+        return JSONResponse({"ref": body["ref"], "object": {"sha": body["sha"]}}, 201)
+
+    @fake.get("/repos/{owner}/{name}/contents/{path:path}")
+    async def get_contents(owner: str, name: str, path: str, ref: str = "main"):
+        r = repo(owner, name)
+        tree = r.tree_of(ref) or {}
+        if path in tree:
+            sha = tree[path]
+            return {"type": "file", "path": path, "sha": sha, "encoding": "base64",
+                    "content": base64.b64encode(r.blobs[sha]).decode()}
+        prefix = path.rstrip("/") + "/"
+        entries = [
+            {"type": "file", "name": p[len(prefix):], "path": p, "sha": s}
+            for p, s in tree.items() if p.startswith(prefix) and "/" not in p[len(prefix):]
+        ]
+        return entries if entries else not_found()
+
+    @fake.put("/repos/{owner}/{name}/contents/{path:path}")
+    async def put_contents(owner: str, name: str, path: str, request: Request):
+        body = await request.json()
+        r = repo(owner, name)
+        branch = body.get("branch", "main")
+        data = base64.b64decode(body["content"])
+        sha = _blob_sha(data)
+        r.blobs[sha] = data
+        head = r.refs.get(branch)
+        tree = dict(r.tree_of(head) or {}) if head else {}
+        tree[path] = sha
+        commit = {"message": body["message"], "tree": r.put_tree(tree), "parents": [head] if head else []}
+        commit_sha = _object_sha(commit)
+        r.commits[commit_sha] = commit
+        r.refs[branch] = commit_sha
+        return JSONResponse({"content": {"path": path, "sha": sha}, "commit": {"sha": commit_sha}}, 201)
+
+    return fake
+
+
+def start_fake_github(latency: Optional[Callable[[], float]] = None, port: int = 0) -> tuple:
+    """Serve the fake GitHub API on 127.0.0.1 from a daemon thread; returns (app, base_url)"""
+    import uvicorn
+
+    fake = create_fake_github(latency)
+    server = uvicorn.Server(uvicorn.Config(fake, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, name="fake-github", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return fake, f"http://127.0.0.1:{bound_port}"
@@ -0,0 +1,92 @@
+"""Cold-start import benchmark.
+
+Imports each entry module in a fresh interpreter several times and compares the median
+wall time with the budget in import_budget.json. It also fails if a module listed under
+"forbidden_imports" (heavy SDKs that must stay lazy) gets loaded at import time.
+
+    python benchmarks/import_time.py             # check against the budget
+    python benchmarks/import_time.py --record    # also append the run to results/import_time.jsonl
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+BUDGET_PATH = os.path.join(BENCH_DIR, "import_budget.json")
+HISTORY_PATH = os.path.join(BENCH_DIR, "results", "import_time.jsonl")
+
+PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))\n"
+)
+
+
+def measure(module: str, forbidden: list, repeat: int) -> dict:
+    samples = []
+    loaded = set()
+    for _ in range(repeat):
+        r = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, forbidden=forbidden)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if r.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{r.stderr}")
+        probe = json.loads(r.stdout.strip().splitlines()[-1])
+        samples.append(probe["seconds"])
+        loaded.update(probe["loaded"])
+    return {"median": statistics.median(samples), "max": max(samples), "forbidden_loaded": sorted(loaded)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="append results to the history file")
+    parser.add_argument("--repeat", type=int, help="fresh interpreters per module")
+    args = parser.parse_args(argv)
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+    repeat = args.repeat or budget.get("repeat", 5)
+    forbidden = budget.get("forbidden_imports", [])
+
+    # Warm the bytecode cache so the numbers reflect imports, not compilation
+    subprocess.run([sys.executable, "-m", "compileall", "-q", ROOT], capture_output=True)
+
+    failures = []
+    results = {}
+    print(f"{'module':<12} {'median':>8} {'budget':>8}")
+    for module, limit in budget["modules"].items():
+        result = measure(module, forbidden, repeat)
+        results[module] = result
+        status = "ok"
+        if result["median"] > limit:
+            status = "OVER BUDGET"
+            failures.append(f"{module}: {result['median']:.3f}s > {limit:.3f}s")
+        if result["forbidden_loaded"]:
+            status = "EAGER IMPORT"
+            failures.append(f"{module}: imports {', '.join(result['forbidden_loaded'])} at import time")
+        print(f"{module:<12} {result['median']:>7.3f}s {limit:>7.3f}s  {status}")
+
+    if args.record:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, "a") as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(), "results": results}) + "\n")
+
+    if failures:
+        print("\n❌ Import-time budget exceeded:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\n✅ All modules within the import-time budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
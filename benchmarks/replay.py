@@ -0,0 +1,330 @@
+"""Replay benchmark for the save-solution pipeline.
+
+Replays a JSONL workload (one LeetcodeSolution per line, the batch.py format) through
+app.py's POST /save-solution job path and frontend.py's save_solution_logic, against the
+fake Gemini and GitHub in benchmarks/fakes.py, at several concurrency levels. Reports
+p50/p95/p99 latency, requests per second and peak RSS for each level.
+
+    python benchmarks/replay.py                                  # 40 synthetic records, both targets
+    python benchmarks/replay.py --workload solutions.jsonl --concurrency 1,8,32
+    python benchmarks/replay.py --llm-latency lognormal:0.8,0.5 --record --compare
+
+Each level writes into a fresh fake repository, so earlier levels don't turn later
+pushes into no-ops. The LLM cache, problem catalog and rate limiters are off unless
+--cache / --rate-limits are given, so the numbers reflect the pipeline itself.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+HISTORY_PATH = os.path.join(BENCH_DIR, "results", "replay.jsonl")
+JOB_POLL = 0.01
+
+sys.path[:0] = [ROOT, BENCH_DIR]
+
+from fakes import FakeLLM, latency_sampler, start_fake_github  # noqa: E402
+
+
+# WORKLOAD
+def synthetic_workload(count: int) -> list:
+    """`count` distinct problems in the standard LeetCode layout"""
+    return [
+        {
+            "problem_statement": (
+                f"{i}. Benchmark Problem {i}\n{('Easy', 'Medium', 'Hard')[i % 3]}\n\n"
+                "Given an integer x, return x.\n\n"
+                f"Example 1:\nInput: x = {i}\nOutput: {i}\n\n"
+                "Constraints:\n1 <= x <= 10^4"
+            ),
+            "code": f"class Solution:\n    def solve(self, x: int) -> int:\n        return x  # {i}\n",
+            "language": "python"
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def load_workload(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# MEASUREMENT
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # No /proc (macOS): fall back to the process-lifetime peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """Track the peak resident set size while a level runs"""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def summarize(target: str, concurrency: int, samples: list, wall: float, peak_mb: float) -> dict:
+    latencies = sorted(latency for latency, _ in samples)
+    ok = sum(1 for _, succeeded in samples if succeeded)
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "ok": ok,
+        "failed": len(samples) - ok,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "wall": round(wall, 3),
+        "peak_rss_mb": round(peak_mb, 1)
+    }
+
+
+# TARGETS
+def _form(record: dict) -> dict:
+    return {k: str(v) for k, v in record.items() if k in ("problem_statement", "code", "language", "problem_name") and v}
+
+
+async def replay_app(llm, records: list, concurrency: int, repo: str) -> list:
+    """POST each record to /save-solution and wait for its job, `concurrency` at a time"""
+    import httpx
+    import app as backend
+
+    backend.get_llm = lambda: llm
+    async with backend.lifespan(backend.app):
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None,
+                                     headers={"X-Session-ID": "replay"}) as client:
+            r = await client.post("/configure-github", json={
+                "github_token": "benchmark", "github_username": "benchmark", "github_repo": repo
+            })
+            r.raise_for_status()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def one(record: dict) -> tuple:
+                async with slots:
+                    start = time.perf_counter()
+                    r = await client.post("/save-solution", data=_form(record))
+                    status_url = r.json()["status_url"]
+                    while True:
+                        job = (await client.get(status_url)).json()
+                        if job["status"] in ("succeeded", "failed"):
+                            break
+                        await asyncio.sleep(JOB_POLL)
+                    return time.perf_counter() - start, job["status"] == "succeeded"
+
+            return await asyncio.gather(*(one(record) for record in records))
+
+
+def replay_frontend(llm, records: list, concurrency: int, repo: str, translate: list) -> list:
+    """Call save_solution_logic from `concurrency` threads, like that many Streamlit sessions"""
+    import streamlit as st
+    import frontend
+
+    frontend.get_llm = lambda: llm
+    st.session_state.github_config = {
+        "github_token": "benchmark", "github_username": "benchmark", "github_repo": repo
+    }
+
+    def one(record: dict) -> tuple:
+        start = time.perf_counter()
+        ok, _ = frontend.save_solution_logic(
+            record["problem_statement"], record["code"], record.get("language", "python"),
+            translate, record.get("problem_name")
+        )
+        return time.perf_counter() - start, ok
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(one, records))
+
+
+# HISTORY
+def git_revision() -> str:
+    r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return r.stdout.strip() or "unknown"
+
+
+def load_history() -> list:
+    try:
+        with open(HISTORY_PATH) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def compare(results: list, settings: dict):
+    previous = next((run for run in reversed(load_history()) if run["settings"] == settings), None)
+    if previous is None:
+        print("\nNo earlier run with the same settings to compare against.")
+        return
+    baseline = {(r["target"], r["concurrency"]): r for r in previous["results"]}
+    print(f"\nCompared with {previous['git_rev']} ({previous['timestamp']}):")
+    for r in results:
+        base = baseline.get((r["target"], r["concurrency"]))
+        if base is None:
+            continue
+
+        def delta(key):
+            return f"{(r[key] - base[key]) / base[key] * 100:+.1f}%" if base[key] else "n/a"
+
+        print(f"  {r['target']:<9} c={r['concurrency']:<4} p95 {delta('p95'):>8}  rps {delta('rps'):>8}  rss {delta('peak_rss_mb'):>8}")
+
+
+# MAIN
+def configure_environment(args, workdir: str, github_url: str):
+    """Point every store at a scratch dir and the GitHub client at the fake server (before importing the app)"""
+    os.environ.update({
+        "GITHUB_API_URL": github_url,
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "JOB_WORKERS": str(max(args.concurrency)),
+        "JOB_POLL_INTERVAL": "0.05",
+        "CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.sqlite3"),
+        "REPO_INDEX_DIR": os.path.join(workdir, "repo_index"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite3"),
+        "CATALOG_PATH": os.path.join(workdir, "catalog.sqlite3"),
+        "CONFIG_STORE_PATH": os.path.join(workdir, "config.sqlite3"),
+        "LLM_CACHE_ENABLED": "1" if args.cache else "0",
+        "CATALOG_ENABLED": "1" if args.cache else "0"
+    })
+    os.environ["COMBINED_ANALYSIS"] = "1" if args.combined else "0"
+    os.environ["NOTE_PROFILE"] = args.profile
+    if not args.rate_limits:
+        os.environ.update({"GEMINI_RPM": "0", "GEMINI_TPM": "0", "GITHUB_RPM": "0"})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workload", help="JSONL file of LeetcodeSolution records (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=40, help="synthetic records when no workload is given")
+    parser.add_argument("--targets", default="app,frontend", help="comma-separated: app, frontend")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--llm-latency", default="lognormal:0.4,0.5", help="fixed:S | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--github-latency", default="uniform:0.02,0.08", help="per-request fake GitHub latency, same syntax")
+    parser.add_argument("--translate", default="", help="comma-separated target languages for the frontend path")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache", action="store_true", help="keep the LLM cache and problem catalog enabled")
+    parser.add_argument("--combined", action="store_true", help="extract and explain in one LLM call")
+    parser.add_argument("--profile", default="standard", choices=["lite", "standard", "full"], help="note profile")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the Gemini/GitHub rate limiters enabled")
+    parser.add_argument("--record", action="store_true", help="append results to benchmarks/results/replay.jsonl")
+    parser.add_argument("--compare", action="store_true", help="compare with the last recorded run with the same settings")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    targets = [t for t in args.targets.split(",") if t]
+    translate = [t for t in args.translate.split(",") if t]
+
+    records = load_workload(args.workload) if args.workload else synthetic_workload(args.requests)
+    _, github_url = start_fake_github(latency_sampler(args.github_latency, args.seed))
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    configure_environment(args, workdir, github_url)
+    from llm import ModelRouter
+    sampler = latency_sampler(args.llm_latency, args.seed)
+    # Route through the model registry like get_llm() does, one fake client per spec
+    llm = ModelRouter(lambda spec: FakeLLM(latency=sampler))
+
+    # Import the app and Streamlit now so the levels measure requests, not imports
+    if "app" in targets:
+        import app  # noqa: F401
+    if "frontend" in targets:
+        import streamlit  # noqa: F401
+        for name in list(logging.root.manager.loggerDict):
+            if name.startswith("streamlit"):
+                # Bare mode warns about the missing ScriptRunContext on every session_state access
+                logging.getLogger(name).setLevel(logging.ERROR)
+        import frontend  # noqa: F401
+    logging.getLogger().setLevel(logging.WARNING)
+
+    run_id = uuid.uuid4().hex[:6]
+    results = []
+    print(f"{'target':<9} {'conc':>4} {'ok':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'rss MB':>8}")
+    for target in targets:
+        for concurrency in args.concurrency:
+            repo = f"replay-{run_id}-{target}-c{concurrency}"
+            with RssSampler() as rss:
+                start = time.perf_counter()
+                if target == "app":
+                    samples = asyncio.run(replay_app(llm, records, concurrency, repo))
+                elif target == "frontend":
+                    samples = replay_frontend(llm, records, concurrency, repo, translate)
+                else:
+                    parser.error(f"unknown target {target!r}")
+                wall = time.perf_counter() - start
+            r = summarize(target, concurrency, samples, wall, rss.peak_mb)
+            results.append(r)
+            print(
+                f"{target:<9} {concurrency:>4} {r['ok']:>5} {r['p50']:>7.3f}s {r['p95']:>7.3f}s "
+                f"{r['p99']:>7.3f}s {r['rps']:>8.2f} {r['peak_rss_mb']:>8.1f}"
+            )
+
+    settings = {
+        "workload": os.path.basename(args.workload) if args.workload else f"synthetic:{args.requests}",
+        "llm_latency": args.llm_latency,
+        "github_latency": args.github_latency,
+        "translate": translate,
+        "cache": args.cache,
+        "rate_limits": args.rate_limits,
+        "combined": args.combined,
+        "profile": args.profile
+    }
+    if args.compare:
+        compare(results, settings)
+    if args.record:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, "a") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now().isoformat(),
+                "git_rev": git_revision(),
+                "settings": settings,
+                "results": results
+            }) + "\n")
+    return 1 if any(r["failed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
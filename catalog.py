@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from typing import Iterable, Optional
+from models import ProblemDetails
+from utils import extract_problem_number
+
+# CATALOG SETTINGS
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "1") != "0"
+CATALOG_PATH = os.getenv("CATALOG_PATH", ".cache/catalog.sqlite3")
+
+
+def normalize_name(name: str) -> str:
+    """'Two-Sum ', 'two sum' and 'Two Sum' all map to 'two sum'"""
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+
+class ProblemCatalog:
+    """Local SQLite index of ProblemDetails keyed by problem number and normalized name.
+
+    Filled from every successful extraction (and bulk imports), so known problems
+    skip the extraction LLM call entirely.
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS problems ("
+            " normalized_name TEXT PRIMARY KEY,"
+            " number INTEGER,"
+            " details TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_problems_number ON problems (number)")
+        self._conn.commit()
+
+    def get(self, number: Optional[int] = None, name: Optional[str] = None) -> Optional[ProblemDetails]:
+        with self._lock:
+            row = None
+            if number is not None:
+                row = self._conn.execute(
+                    "SELECT details FROM problems WHERE number = ? ORDER BY updated_at DESC LIMIT 1", (number,)
+                ).fetchone()
+            if row is None and name:
+                row = self._conn.execute(
+                    "SELECT details FROM problems WHERE normalized_name = ?", (normalize_name(name),)
+                ).fetchone()
+        return ProblemDetails.model_validate_json(row[0]) if row else None
+
+    def lookup(self, problem_name: Optional[str], problem_statement: str) -> Optional[ProblemDetails]:
+        """Match the optional problem_name field first, then the statement's first line"""
+        candidates = []
+        if problem_name and problem_name.strip():
+            candidates.append(problem_name)
+        header = next((line for line in problem_statement.splitlines() if line.strip()), "")
+        if header:
+            candidates.append(header)
+
+        for candidate in candidates:
+            number, name = extract_problem_number(candidate, None)
+            details = self.get(number, name)
+            if details is not None:
+                return details
+        return None
+
+    def put(self, details: ProblemDetails):
+        self.put_many([details])
+
+    def put_many(self, records: Iterable[ProblemDetails]) -> int:
+        rows = [
+            (normalize_name(d.problem_name), d.problem_number, d.model_dump_json(), time.time())
+            for d in records
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO problems VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM problems").fetchone()[0]
+
+
+_catalog: Optional[ProblemCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Optional[ProblemCatalog]:
+    """Return the shared catalog, or None when CATALOG_ENABLED=0"""
+    global _catalog
+    if not CATALOG_ENABLED:
+        return None
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ProblemCatalog()
+    return _catalog
+
+
+def _read_records(path: str) -> Iterable[ProblemDetails]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            for record in json.load(f):
+                yield ProblemDetails.model_validate(record)
+            return
+        for line in f:
+            if line.strip():
+                yield ProblemDetails.model_validate_json(line)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the local problem catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_cmd = sub.add_parser("import", help="bulk import ProblemDetails from .jsonl or a .json array")
+    import_cmd.add_argument("path")
+    sub.add_parser("stats", help="show the number of cataloged problems")
+    args = parser.parse_args(argv)
+
+    catalog = ProblemCatalog()
+    if args.command == "import":
+        imported = catalog.put_many(_read_records(args.path))
+        print(f"📚 Imported {imported} problems ({catalog.count()} in catalog)")
+    else:
+        print(f"📚 {catalog.count()} problems in catalog")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
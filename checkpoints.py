@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# CHECKPOINT SETTINGS
+CHECKPOINTS_ENABLED = os.getenv("CHECKPOINTS_ENABLED", "1") != "0"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite3")
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(7 * 24 * 3600)))
+
+
+def submission_key(
+    problem_statement: str,
+    code: str,
+    language: str,
+    problem_name: Optional[str] = None,
+    target_languages: Optional[list] = None,
+    note_profile: Optional[str] = None
+) -> str:
+    """Stable key for one submission, so a retry of the same request finds its checkpoints"""
+    parts = {
+        "problem_statement": problem_statement,
+        "code": code,
+        "language": language,
+        "problem_name": problem_name or "",
+        "target_languages": sorted(target_languages or [])
+    }
+    if note_profile:
+        # A lite explanation must not be reused for a full one
+        parts["note_profile"] = note_profile
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class CheckpointStore:
+    """SQLite table of per-stage pipeline outputs keyed by (submission key, stage).
+
+    Stages: extraction, explanation, rendering, translation:<language> and push.
+    Entries older than `ttl` are pruned when the store opens.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH, ttl: float = CHECKPOINT_TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " submission_key TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (submission_key, stage))"
+        )
+        self._conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - ttl,))
+        self._conn.commit()
+
+    def load(self, key: str) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, data FROM checkpoints WHERE submission_key = ?", (key,)
+            ).fetchall()
+        return {stage: json.loads(data) for stage, data in rows}
+
+    def save(self, key: str, stage: str, data: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+                (key, stage, json.dumps(data), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE submission_key = ?", (key,))
+            self._conn.commit()
+
+    def checkpoint(self, key: str) -> "Checkpoint":
+        return Checkpoint(self, key)
+
+
+class Checkpoint:
+    """The checkpoints of one submission, loaded once and written through on save"""
+
+    def __init__(self, store: CheckpointStore, key: str):
+        self.store = store
+        self.key = key
+        self.stages = store.load(key)
+        self.resumed = []
+        if self.stages:
+            logger.info(f"♻️ Resuming submission {key[:8]} with {len(self.stages)} saved stages")
+
+    def get(self, stage: str) -> Optional[Any]:
+        """Saved output for `stage`, or None if it still has to run"""
+        data = self.stages.get(stage)
+        if data is not None and stage not in self.resumed:
+            self.resumed.append(stage)
+        return data
+
+    def save(self, stage: str, data: Any):
+        self.stages[stage] = data
+        self.store.save(self.key, stage, data)
+
+    def clear(self):
+        self.stages = {}
+        self.store.clear(self.key)
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """Return the shared store, or None when CHECKPOINTS_ENABLED=0"""
+    global _store
+    if not CHECKPOINTS_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore()
+    return _store
+
+
+def open_checkpoint(
+    problem_statement: str,
+    code: str,
+    language: str,
+    problem_name: Optional[str] = None,
+    target_languages: Optional[list] = None,
+    note_profile: Optional[str] = None,
+    fresh: bool = False
+) -> Optional[Checkpoint]:
+    """Checkpoint for a submission, or None when checkpoints are disabled.
+
+    `fresh` (set for "Regenerate" / bypass_cache) drops stages saved by earlier
+    attempts, so every stage runs again and the new outputs are checkpointed instead.
+    """
+    store = get_checkpoint_store()
+    if store is None:
+        return None
+    checkpoint = store.checkpoint(submission_key(
+        problem_statement, code, language, problem_name, target_languages, note_profile
+    ))
+    if fresh and checkpoint.stages:
+        checkpoint.clear()
+    return checkpoint
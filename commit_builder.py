@@ -0,0 +1,298 @@
+import os
+import base64
+import random
+import asyncio
+import logging
+import posixpath
+from typing import Dict, List, Optional
+from github_client import GithubClient, GithubError
+from utils import git_blob_sha, same_content
+from repo_index import RepoIndex, get_repo_index
+from manifest import SOLUTIONS_MANIFEST_ENABLED, ManifestUpdate
+
+logger = logging.getLogger(__name__)
+
+GITHUB_COMMIT_RETRIES = int(os.getenv("GITHUB_COMMIT_RETRIES", "5"))
+GITHUB_BLOB_CONCURRENCY = int(os.getenv("GITHUB_BLOB_CONCURRENCY", "8"))
+GITHUB_SKIP_UNCHANGED = os.getenv("GITHUB_SKIP_UNCHANGED", "1") != "0"
+
+
+class CommitBuilder:
+    """Push many files as one commit through the Git Data API.
+
+    Blobs are created once, then a tree and commit are built on top of the current
+    branch head and the ref is fast-forwarded. If another writer moved the branch in
+    the meantime the ref update is rejected; the tree is rebuilt on the new head and
+    the update retried with jittered backoff, so concurrent submissions neither
+    clobber nor block each other. Files whose content already matches the branch are
+    left out, and no commit is made when nothing changed. Remote SHAs come from the
+    shared RepoIndex when it is enabled, falling back to one listing per folder.
+    With the manifest enabled, the index shards under solutions/index/ and the
+    generated pages are re-derived from the head each attempt builds on, so a rebase
+    never drops another writer's entries.
+    """
+
+    def __init__(
+        self,
+        client: GithubClient,
+        owner: str,
+        repo: str,
+        branch: str = "main",
+        max_retries: int = GITHUB_COMMIT_RETRIES,
+        skip_unchanged: bool = GITHUB_SKIP_UNCHANGED,
+        index: Optional[RepoIndex] = None,
+        manifest: bool = SOLUTIONS_MANIFEST_ENABLED
+    ):
+        self.client = client
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.max_retries = max_retries
+        self.skip_unchanged = skip_unchanged
+        self.index = index if index is not None else get_repo_index(owner, repo, branch)
+        self.manifest = manifest
+        self._blob_slots = asyncio.Semaphore(GITHUB_BLOB_CONCURRENCY)
+
+    @property
+    def _repo_path(self) -> str:
+        return f"/repos/{self.owner}/{self.repo}"
+
+    async def _create_blob(self, content: str) -> str:
+        async with self._blob_slots:
+            r = await self.client.request("POST", f"{self._repo_path}/git/blobs", json={
+                "content": base64.b64encode(content.encode()).decode(),
+                "encoding": "base64"
+            })
+        if r.status_code != 201:
+            raise GithubError(r, "Create blob")
+        return r.json()["sha"]
+
+    async def _get_head(self) -> Optional[str]:
+        r = await self.client.request("GET", f"{self._repo_path}/git/ref/heads/{self.branch}")
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise GithubError(r, "Get branch ref")
+        return r.json()["object"]["sha"]
+
+    async def _get_tree(self, commit_sha: str) -> str:
+        r = await self.client.request("GET", f"{self._repo_path}/git/commits/{commit_sha}")
+        if r.status_code != 200:
+            raise GithubError(r, "Get commit")
+        return r.json()["tree"]["sha"]
+
+    async def _list_folder(self, folder: str) -> Dict[str, str]:
+        """{path: blob sha} for the files directly inside `folder` on the branch"""
+        r = await self.client.get_contents(self.owner, self.repo, folder, ref=self.branch)
+        if r.status_code == 404:
+            return {}
+        if r.status_code != 200:
+            raise GithubError(r, "List folder")
+        entries = r.json()
+        if not isinstance(entries, list):
+            return {}
+        return {e["path"]: e["sha"] for e in entries if e["type"] == "file"}
+
+    async def _get_blob(self, sha: str) -> str:
+        r = await self.client.request("GET", f"{self._repo_path}/git/blobs/{sha}")
+        if r.status_code != 200:
+            raise GithubError(r, "Get blob")
+        return base64.b64decode(r.json()["content"]).decode()
+
+    async def _read_file(self, path: str, ref: str) -> Optional[str]:
+        """Content of `path` at commit `ref`, or None if it doesn't exist there"""
+        r = await self.client.get_contents(self.owner, self.repo, path, ref=ref)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise GithubError(r, "Get file")
+        body = r.json()
+        if body.get("encoding") == "base64" and body.get("content"):
+            return base64.b64decode(body["content"]).decode()
+        # Files over 1 MB come back without inline content
+        return await self._get_blob(body["sha"])
+
+    async def _manifest_entries(self, head: Optional[str], problems, paths) -> list:
+        """Tree entries updating the manifest for `problems` on top of `head`"""
+        update = ManifestUpdate(problems, paths)
+        while missing := update.missing():
+            if head:
+                texts = await asyncio.gather(*(self._read_file(path, head) for path in missing))
+            else:
+                texts = [None] * len(missing)
+            update.load(dict(zip(missing, texts)))
+        updates = update.files()
+
+        async def blob(content: Optional[str]) -> Optional[str]:
+            # A null sha deletes the path (a tag page nothing carries any more)
+            return await self._create_blob(content) if content is not None else None
+
+        shas = await asyncio.gather(*(blob(updates[p]) for p in updates))
+        return [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in zip(updates, shas)
+        ]
+
+    async def unchanged_files(self, files: Dict[str, str]) -> List[str]:
+        """Paths whose content on the branch already matches `files`.
+
+        Remote SHAs (from the index, or one listing per folder) are compared against
+        locally computed blob SHAs. Only notes whose SHA differs are downloaded, to check
+        whether the "Generated on" timestamp is the only change.
+        """
+        if self.index is not None and await self.index.refresh(self.client):
+            remote = {path: self.index.sha(path) for path in files if self.index.exists(path)}
+        else:
+            folders = sorted({posixpath.dirname(path) for path in files})
+            remote = {}
+            for listing in await asyncio.gather(*(self._list_folder(folder) for folder in folders)):
+                remote.update(listing)
+
+        async def unchanged(path: str) -> bool:
+            sha = remote.get(path)
+            if sha is None:
+                return False
+            if sha == git_blob_sha(files[path]):
+                return True
+            return path.endswith(".md") and same_content(await self._get_blob(sha), files[path])
+
+        flags = await asyncio.gather(*(unchanged(path) for path in files))
+        return [path for path, same in zip(files, flags) if same]
+
+    async def read_file(self, path: str) -> Optional[str]:
+        """Content of `path` on the branch, or None if it doesn't exist"""
+        return await self._read_file(path, self.branch)
+
+    async def _bootstrap_empty_repo(self, path: str, content: str, message: str):
+        # The Git Data API rejects writes to a repo without commits, so the very first
+        # file goes through the contents API to create the branch.
+        r = await self.client.put_contents(self.owner, self.repo, path, content, message, branch=self.branch)
+        if r.status_code not in (200, 201):
+            raise GithubError(r, "Initial commit")
+
+    async def commit_files(
+        self,
+        files: Dict[str, str],
+        message: str,
+        problems: Optional[Dict[str, dict]] = None
+    ) -> dict:
+        """Commit {path: content} to the branch in a single commit and move the ref once.
+
+        `problems` maps each target folder to the problem it is for ({problem_number,
+        problem_name}); with the index enabled, a folder already holding a different
+        problem raises FolderCollisionError before anything is written.
+
+        Returns {"commit_sha", "files", "manifest", "unchanged"}: "files" are the committed
+        paths of `files`, "manifest" the index/page paths written or deleted alongside them.
+        When every file (and the manifest) is unchanged no commit is created and commit_sha
+        is the current head.
+        """
+        files = dict(files)
+        all_paths = list(files)
+        with_manifest = self.manifest and bool(problems)
+        if self.index is not None and problems:
+            await self.index.refresh(self.client)
+            for folder, problem in problems.items():
+                self.index.check_collision(folder, problem)
+        unchanged = await self.unchanged_files(files) if self.skip_unchanged else []
+        if unchanged:
+            logger.info(f"⏭️ Skipping {len(unchanged)} unchanged files")
+            for path in unchanged:
+                files.pop(path)
+            if not files and not with_manifest:
+                if self.index is not None:
+                    self.index.record_commit({}, problems)
+                return {"commit_sha": await self._get_head(), "files": [], "manifest": [], "unchanged": unchanged}
+        try:
+            paths = list(files)
+            shas = await asyncio.gather(*(self._create_blob(files[p]) for p in paths))
+        except GithubError as e:
+            if e.status_code != 409:
+                raise
+            logger.info("📦 Repository is empty, creating initial commit")
+            first_path = next(iter(files))
+            first_content = files.pop(first_path)
+            await self._bootstrap_empty_repo(first_path, first_content, message)
+            if self.index is not None:
+                self.index.record_commit({first_path: git_blob_sha(first_content)}, problems)
+            if not files and not with_manifest:
+                return {
+                    "commit_sha": await self._get_head(), "files": [first_path], "manifest": [], "unchanged": unchanged
+                }
+            if with_manifest:
+                # Keep the first file in the set so the manifest entry lists it too
+                files[first_path] = first_content
+            result = await self.commit_files(files, message, problems)
+            result["files"] = [first_path] + [p for p in result["files"] if p != first_path]
+            result["unchanged"] = unchanged + [p for p in result["unchanged"] if p != first_path]
+            return result
+
+        tree_entries = [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in zip(paths, shas)
+        ]
+
+        for attempt in range(self.max_retries + 1):
+            head = await self._get_head()
+            entries = list(tree_entries)
+            if with_manifest:
+                entries += await self._manifest_entries(head, problems, all_paths)
+            if not entries:
+                if self.index is not None:
+                    self.index.record_commit({}, problems)
+                return {"commit_sha": head, "files": [], "manifest": [], "unchanged": unchanged}
+            tree_payload = {"tree": entries}
+            if head:
+                tree_payload["base_tree"] = await self._get_tree(head)
+
+            r = await self.client.request("POST", f"{self._repo_path}/git/trees", json=tree_payload)
+            if r.status_code != 201:
+                raise GithubError(r, "Create tree")
+            tree_sha = r.json()["sha"]
+
+            r = await self.client.request("POST", f"{self._repo_path}/git/commits", json={
+                "message": message,
+                "tree": tree_sha,
+                "parents": [head] if head else []
+            })
+            if r.status_code != 201:
+                raise GithubError(r, "Create commit")
+            commit_sha = r.json()["sha"]
+
+            if head:
+                r = await self.client.request(
+                    "PATCH",
+                    f"{self._repo_path}/git/refs/heads/{self.branch}",
+                    json={"sha": commit_sha, "force": False}
+                )
+            else:
+                r = await self.client.request("POST", f"{self._repo_path}/git/refs", json={
+                    "ref": f"refs/heads/{self.branch}",
+                    "sha": commit_sha
+                })
+
+            if r.status_code in (200, 201):
+                if self.index is not None:
+                    self.index.record_commit({e["path"]: e["sha"] for e in entries}, problems, commit_sha)
+                return {
+                    "commit_sha": commit_sha,
+                    "files": paths,
+                    "manifest": [e["path"] for e in entries[len(tree_entries):]],
+                    "unchanged": unchanged
+                }
+
+            # 422 = not a fast-forward (or ref already created): someone else committed first
+            if r.status_code != 422 or attempt == self.max_retries:
+                raise GithubError(r, "Update branch ref")
+
+            delay = min(0.25 * 2 ** attempt, 4.0) * random.uniform(0.5, 1.5)
+            logger.info(f"🔁 Branch moved during commit, rebasing (attempt {attempt + 1}) in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+def make_builder(config: dict):
+    """CommitBuilder for a GithubConfig dict, or the shared LocalGitRepo when its backend is local"""
+    if config.get("backend") == "local":
+        from local_git import get_local_repo
+        return get_local_repo(config["local_path"])
+    return CommitBuilder(GithubClient(config["github_token"]), config["github_username"], config["github_repo"])
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import logging
+import importlib
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# CONFIG STORE SETTINGS
+CONFIG_STORE = os.getenv("CONFIG_STORE", "sqlite")
+CONFIG_STORE_PATH = os.getenv("CONFIG_STORE_PATH", ".cache/config.sqlite3")
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "5"))
+CONFIG_CACHE_MAX_ENTRIES = int(os.getenv("CONFIG_CACHE_MAX_ENTRIES", "10000"))
+# Key for encrypting tokens at rest; without one a key file is generated at CONFIG_KEY_PATH
+CONFIG_SECRET_KEY = os.getenv("CONFIG_SECRET_KEY", "")
+CONFIG_KEY_PATH = os.getenv("CONFIG_KEY_PATH", ".cache/config.key")
+
+# Session used by clients that don't send a session header, i.e. the old single-tenant API
+DEFAULT_SESSION = "default"
+
+# Config fields encrypted before they reach the backing store
+SECRET_FIELDS = ("github_token",)
+_ENCRYPTED_PREFIX = "enc:v1:"
+
+
+def session_hash(session_id: str) -> str:
+    """Store key for a session; the raw ID works as a bearer token so it is never persisted"""
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+def _load_key() -> bytes:
+    if CONFIG_SECRET_KEY:
+        # Any passphrase works; it is stretched into a Fernet key
+        return base64.urlsafe_b64encode(hashlib.sha256(CONFIG_SECRET_KEY.encode()).digest())
+    if os.path.exists(CONFIG_KEY_PATH):
+        with open(CONFIG_KEY_PATH, "rb") as f:
+            return f.read().strip()
+    from cryptography.fernet import Fernet
+    os.makedirs(os.path.dirname(os.path.abspath(CONFIG_KEY_PATH)), exist_ok=True)
+    # Written aside and linked into place, so concurrent workers all end up with the first key
+    tmp = f"{CONFIG_KEY_PATH}.{os.getpid()}"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(Fernet.generate_key())
+    try:
+        os.link(tmp, CONFIG_KEY_PATH)
+        logger.info(f"🔑 Generated config encryption key at {CONFIG_KEY_PATH}")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(CONFIG_KEY_PATH, "rb") as f:
+        return f.read().strip()
+
+
+class SecretBox:
+    """Encrypts the SECRET_FIELDS of a config with Fernet; values stored before encryption pass through"""
+
+    def __init__(self, key: Optional[bytes] = None):
+        from cryptography.fernet import Fernet
+        self._fernet = Fernet(key or _load_key())
+
+    def seal(self, config: dict) -> dict:
+        sealed = dict(config)
+        for field in SECRET_FIELDS:
+            value = sealed.get(field)
+            if value and not value.startswith(_ENCRYPTED_PREFIX):
+                sealed[field] = _ENCRYPTED_PREFIX + self._fernet.encrypt(value.encode()).decode()
+        return sealed
+
+    def open(self, config: dict) -> dict:
+        opened = dict(config)
+        for field in SECRET_FIELDS:
+            value = opened.get(field)
+            if value and value.startswith(_ENCRYPTED_PREFIX):
+                opened[field] = self._fernet.decrypt(value[len(_ENCRYPTED_PREFIX):].encode()).decode()
+        return opened
+
+
+class ConfigStore:
+    """Per-session GitHub configuration shared by every API worker.
+
+    Subclasses implement get/put/delete over session keys (hashed session IDs).
+    Set CONFIG_STORE to "module:Class" to plug in another backend.
+    """
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def put(self, key: str, config: dict):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryConfigStore(ConfigStore):
+    """Process-local store; only correct with a single worker"""
+
+    def __init__(self):
+        self._configs: Dict[str, dict] = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        config = self._configs.get(key)
+        return dict(config) if config is not None else None
+
+    def put(self, key: str, config: dict):
+        self._configs[key] = dict(config)
+
+    def delete(self, key: str):
+        self._configs.pop(key, None)
+
+
+class SQLiteConfigStore(ConfigStore):
+    """Configs in a SQLite file that every worker on the host opens"""
+
+    def __init__(self, path: str = CONFIG_STORE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS configs ("
+            " session TEXT PRIMARY KEY,"
+            " config TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM configs WHERE session = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, config: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO configs VALUES (?, ?, ?)", (key, json.dumps(config), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM configs WHERE session = ?", (key,))
+            self._conn.commit()
+
+
+class CachedConfigStore(ConfigStore):
+    """Read-through cache in front of a shared store.
+
+    Hits are served from memory for `ttl` seconds, so the hot path touches the
+    backing store at most once per session per TTL. Writes go straight through and
+    refresh this process's copy; other workers pick them up, deletions included, once
+    their copy expires. Misses are not cached, so a session configured on another
+    worker is found at once. Tokens are encrypted with `box` before they reach the
+    backing store and only held decrypted in memory.
+    """
+
+    def __init__(
+        self,
+        store: ConfigStore,
+        ttl: float = CONFIG_CACHE_TTL,
+        max_entries: int = CONFIG_CACHE_MAX_ENTRIES,
+        box: Optional[SecretBox] = None
+    ):
+        self.store = store
+        self.box = box or SecretBox()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: Dict[str, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+        config = self.store.get(key)
+        if config is not None:
+            config = self.box.open(config)
+        with self._lock:
+            if config is None:
+                self._cache.pop(key, None)
+            else:
+                self._remember(key, config, now)
+        return config
+
+    def put(self, key: str, config: dict):
+        self.store.put(key, self.box.seal(config))
+        with self._lock:
+            self._remember(key, config, time.monotonic())
+
+    def delete(self, key: str):
+        self.store.delete(key)
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def _remember(self, key: str, config: dict, now: float):
+        if key not in self._cache and len(self._cache) >= self.max_entries:
+            # Dicts keep insertion order, so this drops the oldest entry
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now, dict(config))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": type(self.store).__name__, "cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+def _open_store(name: str) -> ConfigStore:
+    if name == "sqlite":
+        return SQLiteConfigStore()
+    if name == "memory":
+        return MemoryConfigStore()
+    module, _, cls = name.partition(":")
+    if not cls:
+        raise ValueError(f"Unknown CONFIG_STORE {name!r}; use sqlite, memory or module:Class")
+    return getattr(importlib.import_module(module), cls)()
+
+
+_store: Optional[CachedConfigStore] = None
+_store_lock = threading.Lock()
+
+
+def get_config_store() -> CachedConfigStore:
+    """Return the shared, cached config store selected by CONFIG_STORE"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CachedConfigStore(_open_store(CONFIG_STORE))
+            logger.info(f"🗄️ Config store: {CONFIG_STORE}")
+    return _store
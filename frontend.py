@@ -1,13 +1,20 @@
 import streamlit as st
-import requests
-import base64
+import asyncio
 import logging
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from models import GithubConfig, LeetcodeSolution, ProblemDetails, Explanation
-from utils import get_file_extension, get_folder_and_filename, create_solution_file, create_notes
-from langchain_core.output_parsers import StrOutputParser
-from prompts import problem_prompt, problem_parser, explanation_prompt, explanation_parser, translation_prompt, chat_prompt
+import prompts
+from llm import get_llm as load_llm
+from pipeline import analyze_solution, translate_solution, render_solution_files, render_translation_files, push_files, folder_owner
+from checkpoints import open_checkpoint
+from notes import NOTE_PROFILE, NOTE_PROFILES, profile_sections
+from github_client import GithubClient, GithubError
+from commit_builder import make_builder
+from runner import run_async
+from llm_cache import CachedChain
+from memory import ConversationMemory
+from rate_limit import request_priority, PRIORITY_INTERACTIVE
+from metrics import track_stage, start_metrics_server
 
 # Page Configuration
 st.set_page_config(
@@ -20,6 +27,9 @@ st.set_page_config(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Metrics are served from a background thread when STREAMLIT_METRICS_PORT is set
+start_metrics_server()
+
 # Session state initialization
 if 'github_config' not in st.session_state:
     st.session_state.github_config = {}
@@ -33,15 +43,31 @@ if 'current_code' not in st.session_state:
     st.session_state.current_code = None
 if 'current_language' not in st.session_state:
     st.session_state.current_language = None
+if 'pending_answer' not in st.session_state:
+    st.session_state.pending_answer = None
+if 'current_explanation' not in st.session_state:
+    st.session_state.current_explanation = None
+if 'chat_memory' not in st.session_state:
+    st.session_state.chat_memory = ConversationMemory()
 
 # Helper Functions
-def configure_github(token, username, repo):
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+def configure_github(token, username, repo, backend="github", local_path=None):
+    if backend == "local":
+        from local_git import get_local_repo
+        try:
+            local_repo = get_local_repo(local_path)
+        except Exception as e:
+            return False, f"Local repository unavailable: {e}"
+        st.session_state.github_config = {
+            "github_token": token,
+            "github_username": username,
+            "github_repo": repo,
+            "backend": "local",
+            "local_path": local_path
+        }
+        return True, f"Committing to {local_repo.path}"
     try:
-        r = requests.get("https://api.github.com/user", headers=headers)
+        r = run_async(GithubClient(token).get_user())
         if r.status_code == 200:
             user = r.json().get("login")
             st.session_state.github_config = {
@@ -58,14 +84,25 @@ def get_llm():
     api_key = st.session_state.google_api_key
     if not api_key:
         return None
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash-lite",
-        temperature=0.2,
-        max_tokens=8192,
-        google_api_key=api_key
-    )
+    # Built once per key and reused across reruns
+    return load_llm(api_key)
+
+def stream_answer(chunks):
+    """Pass chat tokens through to the UI while keeping the partial answer in session state"""
+    st.session_state.pending_answer = ""
+    for chunk in chunks:
+        st.session_state.pending_answer += chunk
+        yield chunk
+
+def stop_chat():
+    # Clicking Stop reruns the script, which abandons the in-flight stream;
+    # keep whatever part of the answer already arrived.
+    partial = st.session_state.pending_answer
+    if partial is not None:
+        st.session_state.chat_history.append({"role": "assistant", "content": f"{partial}\n\n_⏹ Stopped_"})
+        st.session_state.pending_answer = None
 
-def save_solution_logic(problem_statement, code, language, target_languages, problem_name=None):
+def save_solution_logic(problem_statement, code, language, target_languages, problem_name=None, bypass_cache=False, note_profile=None):
     if not st.session_state.github_config:
         return False, "GitHub not configured"
     
@@ -74,110 +111,61 @@ def save_solution_logic(problem_statement, code, language, target_languages, pro
         return False, "Google API Key not configured"
 
     config = st.session_state.github_config
-    headers = {
-        "Authorization": f"token {config['github_token']}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+    # Retrying after a failure reuses every stage that already finished
+    checkpoint = open_checkpoint(
+        problem_statement, code, language, problem_name, target_languages, note_profile, fresh=bypass_cache
+    )
 
     try:
-        # 1. Extract Problem Details
-        problem_chain = problem_prompt | llm_instance | problem_parser
-        problem_details = problem_chain.invoke({"problem_statement": problem_statement})
-        
-        # 2. Generate Explanation
-        explain_chain = explanation_prompt | llm_instance | explanation_parser
-        explanation = explain_chain.invoke({
-            "problem_statement": problem_statement,
-            "code": code,
-            "language": language
-        })
-
-        # 3. Prepare Files
-        extension = get_file_extension(language)
-        folder, filename = get_folder_and_filename(
-            problem_details.problem_number,
-            problem_details.problem_name,
-            extension
-        )
-        code_file = create_solution_file(code, language)
-        notes_file = create_notes(problem_details, explanation)
-
-        files_pushed = []
-
-        # Helper to push file to GitHub
-        def push_to_github(path, content, message):
-            # Check if file exists to get sha
-            get_r = requests.get(
-                 f"https://api.github.com/repos/{config['github_username']}/{config['github_repo']}/contents/{path}",
-                 headers=headers
-            )
-            sha = get_r.json().get('sha') if get_r.status_code == 200 else None
-            
-            payload = {
-                "message": message,
-                "content": base64.b64encode(content.encode()).decode(),
-                "branch": "main"
-            }
-            if sha:
-                payload["sha"] = sha
-                payload["message"] = f"Update: {message}"
-
-            r = requests.put(
-                f"https://api.github.com/repos/{config['github_username']}/{config['github_repo']}/contents/{path}",
-                headers=headers,
-                json=payload
-            )
-            return r.status_code in (200, 201), r.text
+        # 1 + 2 + 3. Extract Problem Details, Generate Explanation and Translate concurrently
+        async def generate():
+            with request_priority(PRIORITY_INTERACTIVE):
+                return await asyncio.gather(
+                    analyze_solution(
+                        llm_instance, problem_statement, code, language,
+                        bypass_cache=bypass_cache, problem_name=problem_name, checkpoint=checkpoint,
+                        sections=profile_sections(note_profile)
+                    ),
+                    translate_solution(
+                        llm_instance, code, language, target_languages,
+                        bypass_cache=bypass_cache, checkpoint=checkpoint
+                    )
+                )
 
-        # 4. Push Original Code File
-        code_path = f"solutions/{folder}/{filename}"
-        success, msg = push_to_github(code_path, code_file, f"Add solution: {problem_details.problem_name} ({language})")
-        if success:
-            files_pushed.append(code_path)
-        else:
-            return False, f"GitHub Code push failed: {msg}"
-
-        # 5. Push Notes File
-        notes_filename = filename.replace(f".{extension}", ".md")
-        notes_path = f"solutions/{folder}/{notes_filename}"
-        success, msg = push_to_github(notes_path, notes_file, f"Add notes: {problem_details.problem_name}")
-        if success:
-            files_pushed.append(notes_path)
-        else:
-            return False, f"GitHub Notes push failed: {msg}"
+        (problem_details, explanation), translations = run_async(generate())
+        st.session_state.current_explanation = explanation
 
-        # 6. Handle Translations
-        if target_languages:
-            translation_chain = translation_prompt | llm_instance | StrOutputParser()
-            
-            for target_lang in target_languages:
-                if target_lang == language:
-                    continue
-                    
-                translated_code = translation_chain.invoke({
-                    "source_language": language,
-                    "target_language": target_lang,
-                    "code": code
-                })
-                
-                target_ext = get_file_extension(target_lang)
-                # Use same filename base but different extension
-                _, target_filename = get_folder_and_filename(
-                    problem_details.problem_number,
-                    problem_details.problem_name,
-                    target_ext
-                )
-                
-                target_path = f"solutions/{folder}/{target_filename}"
-                target_content = create_solution_file(translated_code, target_lang)
-                
-                success, msg = push_to_github(target_path, target_content, f"Add solution: {problem_details.problem_name} ({target_lang})")
-                if success:
-                    files_pushed.append(target_path)
+        # 4. Prepare Files
+        with track_stage("rendering"):
+            folder, files = render_solution_files(problem_details, explanation, code, language, checkpoint)
+            files.update(render_translation_files(problem_details, folder, translations))
+
+        # 5. Push code, notes and translations together in a single commit
+        builder = make_builder(config)
+        try:
+            with track_stage("push"):
+                commit = run_async(push_files(
+                    builder,
+                    files,
+                    f"Add solution: {problem_details.problem_name} ({language})",
+                    checkpoint,
+                    folder_owner(folder, problem_details)
+                ))
+        except GithubError as e:
+            return False, f"GitHub push failed: {e}"
+        files_pushed = commit["files"]
+        if checkpoint:
+            checkpoint.clear()
 
         return True, {
             "problem": problem_details.dict(),
-            "files_pushed": files_pushed
+            "files_pushed": files_pushed,
+            "files_unchanged": commit.get("unchanged", []),
+            "translations": {
+                lang: {"status": "success", "path": result["path"]} if "path" in result
+                else {"status": "error", "error": result["error"]}
+                for lang, result in translations.items()
+            }
         }
 
     except Exception as e:
@@ -209,7 +197,14 @@ def main():
 
         # GitHub Config
         if st.session_state.github_config:
-            st.success(f"✅ Connected to GitHub as {st.session_state.github_config.get('github_username')}")
+            config = st.session_state.github_config
+            if config.get("backend") == "local":
+                st.success(f"✅ Committing to local repo {config['local_path']}")
+                if st.button("Push now"):
+                    pushed = run_async(make_builder(config).flush())
+                    st.toast("Pushed pending commits" if pushed else "Push failed, commits kept locally")
+            else:
+                st.success(f"✅ Connected to GitHub as {config.get('github_username')}")
             if st.button("Disconnect GitHub"):
                 st.session_state.github_config = {}
                 st.rerun()
@@ -219,8 +214,20 @@ def main():
                 token = st.text_input("GitHub Token", type="password")
                 username = st.text_input("GitHub Username")
                 repo = st.text_input("Repository Name", value="leetcode-solutions")
+                backend = st.selectbox(
+                    "Storage Backend", ["github", "local"],
+                    help="local commits into a clone or bare repo on this machine and pushes in batches"
+                )
+                local_path = st.text_input("Local Repository Path", placeholder="~/leetcode-solutions")
                 if st.form_submit_button("Connect"):
-                    if token and username:
+                    if backend == "local" and username and local_path:
+                        success, msg = configure_github(token, username, repo, backend, local_path)
+                        if success:
+                            st.success(msg)
+                            st.rerun()
+                        else:
+                            st.error(msg)
+                    elif backend == "github" and token and username:
                         success, msg = configure_github(token, username, repo)
                         if success:
                             st.success(msg)
@@ -259,6 +266,18 @@ def main():
                 help="Select languages to automatically translate and save your solution to."
             )
             
+            note_profile = st.selectbox(
+                "Notes",
+                list(NOTE_PROFILES),
+                index=list(NOTE_PROFILES).index(NOTE_PROFILE) if NOTE_PROFILE in NOTE_PROFILES else 1,
+                help="lite and standard skip the slowest sections; they can be added later through the API"
+            )
+
+            bypass_cache = st.checkbox(
+                "Regenerate (skip cache)",
+                help="Ignore cached LLM responses for this submission."
+            )
+
             submitted = st.form_submit_button("🚀 Process & Push", type="primary")
 
         if submitted:
@@ -270,12 +289,22 @@ def main():
                 st.session_state.current_code = code
                 st.session_state.current_language = language
                 st.session_state.chat_history = [] # Reset chat on new submission
+                st.session_state.chat_memory = ConversationMemory()
+                st.session_state.current_explanation = None
 
                 with st.spinner("Processing... Analyzing, Translating, and Pushing to GitHub..."):
-                    success, result = save_solution_logic(problem_statement, code, language, target_languages, problem_name)
+                    success, result = save_solution_logic(
+                        problem_statement, code, language, target_languages, problem_name, bypass_cache, note_profile
+                    )
                     
                     if success:
-                        st.success("✅ Solution saved successfully!")
+                        if result["files_pushed"]:
+                            st.success("✅ Solution saved successfully!")
+                        else:
+                            st.info("ℹ️ Everything on GitHub is already up to date, no commit created")
+                        for lang, translation in result["translations"].items():
+                            if translation["status"] == "error":
+                                st.warning(f"⚠️ Translation to {lang} failed: {translation['error']}")
                         st.json(result)
                     else:
                         st.error(f"❌ Error: {result}")
@@ -290,6 +319,11 @@ def main():
             for message in st.session_state.chat_history:
                 with st.chat_message(message["role"]):
                     st.markdown(message["content"])
+                    if "usage" in message:
+                        st.caption(
+                            f"📊 {message['usage']['prompt_tokens']:,} prompt tokens "
+                            f"(full context would be {message['usage']['full_context_tokens']:,})"
+                        )
 
             # Chat input
             if prompt := st.chat_input("Ask a question about your solution..."):
@@ -302,15 +336,29 @@ def main():
                 with st.chat_message("assistant"):
                     llm_instance = get_llm()
                     if llm_instance:
-                        chat_chain = chat_prompt | llm_instance | StrOutputParser()
-                        response = chat_chain.invoke({
-                            "problem_statement": st.session_state.current_problem,
-                            "language": st.session_state.current_language,
-                            "code": st.session_state.current_code,
-                            "question": prompt
-                        })
-                        st.markdown(response)
-                        st.session_state.chat_history.append({"role": "assistant", "content": response})
+                        memory = st.session_state.chat_memory
+                        inputs = memory.build_inputs(
+                            prompt,
+                            st.session_state.current_problem,
+                            st.session_state.current_code,
+                            st.session_state.current_language,
+                            st.session_state.current_explanation
+                        )
+                        usage = memory.usage(inputs, st.session_state.current_code, st.session_state.current_language)
+
+                        chat_chain = CachedChain(prompts.chat_prompt, llm_instance, stage="chat")
+                        st.button("⏹ Stop", key="stop_chat", on_click=stop_chat)
+                        with request_priority(PRIORITY_INTERACTIVE):
+                            response = st.write_stream(stream_answer(chat_chain.stream(inputs)))
+                        st.session_state.pending_answer = None
+                        st.caption(
+                            f"📊 {usage['prompt_tokens']:,} prompt tokens "
+                            f"(full context would be {usage['full_context_tokens']:,})"
+                        )
+                        st.session_state.chat_history.append({"role": "assistant", "content": response, "usage": usage})
+
+                        memory.add_turn(prompt, response)
+                        memory.compact(llm_instance, inputs)
                     else:
                         st.error("LLM not initialized")
 
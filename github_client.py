@@ -0,0 +1,134 @@
+import os
+import time
+import base64
+import asyncio
+from typing import Optional
+import httpx
+from rate_limit import get_limiter, retry_after_from_headers
+from metrics import GITHUB_DURATION, GITHUB_IN_FLIGHT, RETRIES, github_endpoint
+
+# GITHUB CLIENT SETTINGS
+# Point GITHUB_API_URL at a local fake server to exercise the push path without GitHub.
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS", "20"))
+GITHUB_MAX_KEEPALIVE = int(os.getenv("GITHUB_MAX_KEEPALIVE", "10"))
+GITHUB_KEEPALIVE_EXPIRY = float(os.getenv("GITHUB_KEEPALIVE_EXPIRY", "30"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+GITHUB_CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "10"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+class GithubError(Exception):
+    """Raised for an unexpected GitHub API response"""
+
+    def __init__(self, response: httpx.Response, action: str):
+        super().__init__(f"{action} failed ({response.status_code}): {response.text}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled AsyncClient, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=GITHUB_MAX_KEEPALIVE,
+                keepalive_expiry=GITHUB_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(GITHUB_TIMEOUT, connect=GITHUB_CONNECT_TIMEOUT)
+        )
+    return _http_client
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]):
+    """Swap the shared client, e.g. for one using a MockTransport or ASGI app in tests"""
+    global _http_client
+    _http_client = client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _is_rate_limited(r: httpx.Response) -> bool:
+    if r.status_code == 429:
+        return True
+    # Secondary rate limits come back as 403 with Retry-After or a "rate limit" message
+    return r.status_code == 403 and (
+        "retry-after" in r.headers
+        or r.headers.get("x-ratelimit-remaining") == "0"
+        or "rate limit" in r.text.lower()
+    )
+
+
+class GithubClient:
+    """Thin async wrapper around the GitHub REST API sharing one connection pool"""
+
+    def __init__(self, token: str, base_url: Optional[str] = None):
+        self.base_url = (base_url or GITHUB_API_URL).rstrip("/")
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request through the shared GitHub rate limiter.
+
+        429s and secondary-rate-limit 403s are retried after Retry-After / X-RateLimit-Reset
+        (or a jittered backoff); an exhausted primary quota pauses every caller until reset.
+        """
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        limiter = get_limiter("github")
+        endpoint = github_endpoint(path)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            start = time.perf_counter()
+            with GITHUB_IN_FLIGHT.track():
+                r = await get_http_client().request(method, url, headers=headers, **kwargs)
+            GITHUB_DURATION.observe(time.perf_counter() - start, method=method, endpoint=endpoint, status=r.status_code)
+            retry_after = retry_after_from_headers(r.headers)
+            if not _is_rate_limited(r):
+                if retry_after and r.headers.get("x-ratelimit-remaining") == "0":
+                    # Last request of the window went through; hold the rest until reset
+                    limiter.pause(retry_after)
+                limiter.record_success()
+                return r
+            if attempt >= limiter.max_retries:
+                return r
+            RETRIES.inc(upstream="github")
+            await asyncio.sleep(limiter.record_throttle(attempt, retry_after))
+            attempt += 1
+
+    async def get_user(self) -> httpx.Response:
+        return await self.request("GET", "/user")
+
+    async def get_contents(self, owner: str, repo: str, path: str, ref: Optional[str] = None) -> httpx.Response:
+        params = {"ref": ref} if ref else None
+        return await self.request("GET", f"/repos/{owner}/{repo}/contents/{path}", params=params)
+
+    async def put_contents(
+        self,
+        owner: str,
+        repo: str,
+        path: str,
+        content: str,
+        message: str,
+        branch: str = "main",
+        sha: Optional[str] = None
+    ) -> httpx.Response:
+        payload = {
+            "message": message,
+            "content": base64.b64encode(content.encode()).decode(),
+            "branch": branch
+        }
+        if sha:
+            payload["sha"] = sha
+        return await self.request("PUT", f"/repos/{owner}/{repo}/contents/{path}", json=payload)
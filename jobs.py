@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# JOB QUEUE SETTINGS
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", ".cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class JobQueue:
+    """Durable job queue stored in SQLite.
+
+    Claiming a job is a single UPDATE ... RETURNING statement, so several worker
+    processes can share one database file without handing out the same job twice.
+    A claim records its owner and a lease that the owner keeps renewing; only jobs
+    whose lease has run out (their process died) are put back in the queue. Jobs
+    carry the hash of the session that submitted them, and lookups by session only
+    see that session's jobs.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " stages TEXT NOT NULL DEFAULT '{}',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " owner TEXT,"
+            " lease_until REAL,"
+            " session TEXT)"
+        )
+        # Databases created before leases and sessions existed
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL"), ("session", "TEXT")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs (session, created_at)")
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+        return rows
+
+    def enqueue(self, kind: str, payload: dict, session: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, session) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), time.time(), session)
+        )
+        return job_id
+
+    def claim(self, owner: str, lease: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        now = time.time()
+        rows = self._execute(
+            "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ?"
+            " WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1)"
+            " AND status = ? RETURNING *",
+            (RUNNING, now, owner, now + lease, QUEUED, QUEUED)
+        )
+        return self._to_dict(rows[0], include_payload=True) if rows else None
+
+    def renew(self, owner: str, lease: float = JOB_LEASE_SECONDS) -> int:
+        """Extend the lease on every job `owner` is running"""
+        rows = self._execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ? RETURNING id",
+            (time.time() + lease, owner, RUNNING)
+        )
+        return len(rows)
+
+    def complete(self, job_id: str, owner: str, result: dict, stages: dict):
+        # A worker whose lease expired (and whose job was handed out again) doesn't overwrite it
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, stages = ?, finished_at = ?, lease_until = NULL"
+            " WHERE id = ? AND owner = ?",
+            (SUCCEEDED, json.dumps(result), json.dumps(stages), time.time(), job_id, owner)
+        )
+
+    def fail(self, job_id: str, owner: str, error: str, stages: dict):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, stages = ?, finished_at = ?, lease_until = NULL"
+            " WHERE id = ? AND owner = ?",
+            (FAILED, error, json.dumps(stages), time.time(), job_id, owner)
+        )
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose owner stopped renewing its lease back in the queue"""
+        rows = self._execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL"
+            " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) RETURNING id",
+            (QUEUED, RUNNING, time.time())
+        )
+        return len(rows)
+
+    def release(self, owner: str) -> int:
+        """Requeue the jobs `owner` is running, e.g. on shutdown"""
+        rows = self._execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE owner = ? AND status = ? RETURNING id",
+            (QUEUED, owner, RUNNING)
+        )
+        return len(rows)
+
+    def get(self, job_id: str, session: Optional[str] = None) -> Optional[dict]:
+        """The job, or None if it doesn't exist or (given `session`) belongs to another session"""
+        if session is None:
+            rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        else:
+            rows = self._execute("SELECT * FROM jobs WHERE id = ? AND session = ?", (job_id, session))
+        return self._to_dict(rows[0]) if rows else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50, session: Optional[str] = None) -> List[dict]:
+        """Most recent jobs first, optionally only those of one status and/or session"""
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if session is not None:
+            where.append("session = ?")
+            params.append(session)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        rows = self._execute(
+            f"SELECT * FROM jobs{clause} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, include_payload: bool = False) -> dict:
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "stages": json.loads(row["stages"]),
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+        # Payloads may hold credentials, so they never leave the worker
+        if include_payload:
+            job["payload"] = json.loads(row["payload"])
+        return job
+
+
+class WorkerPool:
+    """In-process asyncio workers draining a JobQueue.
+
+    The handler receives the claimed job and a stage timings dict it should fill in;
+    it returns the job result or raises to mark the job failed. While the pool runs it
+    renews the leases on its jobs and requeues jobs abandoned by dead processes.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[dict, dict], Awaitable[dict]],
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        lease: float = JOB_LEASE_SECONDS
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        # Identifies this process's claims; other processes only requeue them once the lease lapses
+        self.owner = uuid.uuid4().hex
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._requeue_expired()
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"👷 Started {self.workers} job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        released = self.queue.release(self.owner)
+        if released:
+            logger.info(f"♻️ Requeued {released} unfinished jobs")
+
+    def _requeue_expired(self):
+        requeued = self.queue.requeue_expired()
+        if requeued:
+            logger.info(f"♻️ Requeued {requeued} interrupted jobs")
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                self.queue.renew(self.owner, self.lease)
+                self._requeue_expired()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job lease renewal failed: {e}")
+
+    def submit(self, kind: str, payload: dict, session: Optional[str] = None) -> str:
+        job_id = self.queue.enqueue(kind, payload, session)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def _work(self, worker_id: int):
+        while True:
+            job = self.queue.claim(self.owner, self.lease)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            stages = {}
+            logger.info(f"👷 Worker {worker_id} running job {job['id']}")
+            try:
+                result = await self.handler(job, stages)
+                self.queue.complete(job["id"], self.owner, result, stages)
+                logger.info(f"✅ Job {job['id']} succeeded")
+            except asyncio.CancelledError:
+                # Shutting down: stop() puts the job back in the queue
+                raise
+            except Exception as e:
+                describe = getattr(e, "describe", None)
+                error = describe() if describe else str(e)
+                self.queue.fail(job["id"], self.owner, error, stages)
+                logger.error(f"❌ Job {job['id']} failed: {error}")
@@ -0,0 +1,409 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import itertools
+import threading
+from typing import Callable, Iterator, Optional
+from rate_limit import RateLimiter, get_limiter, estimate_tokens, retry_after_from_error
+from metrics import LLM_CACHE_LOOKUPS, LLM_CALLS, LLM_DURATION, LLM_IN_FLIGHT, LLM_TOKENS, RETRIES
+
+logger = logging.getLogger(__name__)
+
+# CACHE SETTINGS
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def template_hash(prompt) -> str:
+    """Hash the template text plus partials, so schema changes invalidate old entries"""
+    partials = {k: v if isinstance(v, str) else repr(v) for k, v in prompt.partial_variables.items()}
+    return _sha256(prompt.template + json.dumps(partials, sort_keys=True))
+
+
+def inputs_hash(inputs: dict) -> str:
+    return _sha256(json.dumps(inputs, sort_keys=True, default=str))
+
+
+def model_identity(llm_instance) -> tuple:
+    model = getattr(llm_instance, "model", None) or getattr(llm_instance, "model_name", None)
+    return str(model or type(llm_instance).__name__), getattr(llm_instance, "temperature", None)
+
+
+class LLMCache:
+    """SQLite-backed cache of raw LLM responses with TTL and LRU eviction.
+
+    Entries are keyed on (prompt template hash, rendered inputs hash, model, temperature)
+    and store the model's raw text, so output parsers still validate cached responses.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl: float = LLM_CACHE_TTL
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " template_hash TEXT NOT NULL,"
+            " inputs_hash TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " temperature REAL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, inputs: dict, llm_instance) -> dict:
+        model, temperature = model_identity(llm_instance)
+        parts = {
+            "template_hash": template_hash(prompt),
+            "inputs_hash": inputs_hash(inputs),
+            "model": model,
+            "temperature": temperature
+        }
+        parts["key"] = _sha256(json.dumps(parts, sort_keys=True))
+        return parts
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key_parts: dict, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key_parts["key"], key_parts["template_hash"], key_parts["inputs_hash"],
+                    key_parts["model"], key_parts["temperature"],
+                    response, len(response.encode()), now, now
+                )
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Drop least recently used rows until both limits hold again
+        removed = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            removed += 1
+        logger.info(f"🧹 LLM cache evicted {removed} entries")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": count,
+            "bytes": total
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Return the shared cache, or None when LLM_CACHE_ENABLED=0"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+    return _cache
+
+
+class CachedChain:
+    """prompt | llm | parser with the raw LLM text served from LLMCache when possible.
+
+    Pass bypass=True to skip the lookup for one call; the fresh response still
+    replaces the cached one so later calls see it. Cache misses go through the shared
+    "gemini" RateLimiter and are retried when the model reports a rate limit.
+
+    When llm_instance is a ModelRouter, `stage` picks the model spec. A call that times
+    out, fails or returns unparseable output moves on to the fallback tier, unless part
+    of a streamed response was already delivered. Only primary-tier responses are
+    cached (under the primary model's key), so a fallback answer never stands in for
+    the primary model once it recovers.
+    """
+
+    def __init__(
+        self,
+        prompt,
+        llm_instance,
+        parser=None,
+        cache: Optional[LLMCache] = None,
+        limiter: Optional[RateLimiter] = None,
+        stage: Optional[str] = None
+    ):
+        self.prompt = prompt
+        self.parser = parser
+        self.stage = stage or "default"
+        route = getattr(llm_instance, "route", None)
+        if route is not None:
+            self.tiers = route(stage)
+        else:
+            spec = {"stage": self.stage, "tier": "primary", "model": model_identity(llm_instance)[0], "timeout": None}
+            self.tiers = [(spec, llm_instance)]
+        self.llm = self.tiers[0][1]
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.limiter = limiter if limiter is not None else get_limiter("gemini")
+        from langchain_core.output_parsers import StrOutputParser
+        self._text_chains = [prompt | client | StrOutputParser() for _, client in self.tiers]
+
+    def _parse(self, text: str):
+        return self.parser.parse(text) if self.parser else text
+
+    def _lookup(self, inputs: dict, bypass: bool):
+        """Return (key_parts, cached_text, parsed_result); the last two are None on a miss"""
+        if self.cache is None:
+            return None, None, None
+        key_parts = self.cache.make_key(self.prompt, inputs, self.llm)
+        if bypass:
+            return key_parts, None, None
+        text = self.cache.get(key_parts["key"])
+        if text is not None:
+            try:
+                parsed = self._parse(text)
+                LLM_CACHE_LOOKUPS.inc(result="hit")
+                return key_parts, text, parsed
+            except Exception as e:
+                logger.warning(f"⚠️ Discarding unparseable cached response: {e}")
+        LLM_CACHE_LOOKUPS.inc(result="miss")
+        return key_parts, None, None
+
+    def _store(self, key_parts, text: str, tier: int = 0):
+        spec = self.tiers[tier][0]
+        try:
+            result = self._parse(text)
+        except Exception:
+            LLM_CALLS.inc(stage=self.stage, model=spec["model"], outcome="invalid")
+            raise
+        LLM_CALLS.inc(stage=self.stage, model=spec["model"], outcome="ok")
+        # Only cache responses that passed the parser and came from the model the key names
+        if key_parts is not None and tier == 0:
+            self.cache.put(key_parts, text)
+        return result
+
+    def _fall_back(self, tier: int, error: Exception, streamed: bool = False) -> bool:
+        """Whether to retry on the next tier after `error`"""
+        if streamed or tier + 1 >= len(self.tiers):
+            return False
+        current, fallback = self.tiers[tier][0]["model"], self.tiers[tier + 1][0]["model"]
+        logger.warning(f"⚠️ {self.stage}: {current} failed ({type(error).__name__}), falling back to {fallback}")
+        return True
+
+    def _prompt_tokens(self, inputs: dict) -> int:
+        return estimate_tokens(self.prompt.format(**inputs))
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a rate-limited call, or None to re-raise"""
+        retry_after = retry_after_from_error(error)
+        if retry_after is None or attempt >= self.limiter.max_retries:
+            return None
+        RETRIES.inc(upstream=self.limiter.name)
+        return self.limiter.record_throttle(attempt, retry_after)
+
+    def _record_call(self, spec: dict, prompt_tokens: int, text: str, start: float):
+        self.limiter.record_success()
+        LLM_DURATION.observe(time.perf_counter() - start, stage=self.stage, model=spec["model"])
+        LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(estimate_tokens(text), kind="completion")
+
+    def _record_failure(self, spec: dict, error: Exception):
+        name = type(error).__name__
+        outcome = "timeout" if isinstance(error, TimeoutError) or "Timeout" in name or "DeadlineExceeded" in name else "error"
+        LLM_CALLS.inc(stage=self.stage, model=spec["model"], outcome=outcome)
+
+    def _call(self, inputs: dict, tier: int = 0) -> str:
+        spec, chain = self.tiers[tier][0], self._text_chains[tier]
+        prompt_tokens = self._prompt_tokens(inputs)
+        for attempt in itertools.count():
+            self.limiter.acquire_sync(prompt_tokens)
+            start = time.perf_counter()
+            try:
+                with LLM_IN_FLIGHT.track():
+                    text = chain.invoke(inputs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    self._record_failure(spec, e)
+                    raise
+                time.sleep(delay)
+                continue
+            self._record_call(spec, prompt_tokens, text, start)
+            return text
+
+    async def _acall(self, inputs: dict, tier: int = 0, on_token: Optional[Callable[[str], None]] = None) -> str:
+        spec, chain = self.tiers[tier][0], self._text_chains[tier]
+        prompt_tokens = self._prompt_tokens(inputs)
+
+        async def generate(chunks: list):
+            if on_token is None:
+                chunks.append(await chain.ainvoke(inputs))
+                return
+            async for chunk in chain.astream(inputs):
+                chunks.append(chunk)
+                on_token(chunk)
+
+        for attempt in itertools.count():
+            await self.limiter.acquire(prompt_tokens)
+            start = time.perf_counter()
+            chunks = []
+            try:
+                with LLM_IN_FLIGHT.track():
+                    await asyncio.wait_for(generate(chunks), spec.get("timeout"))
+            except Exception as e:
+                # A stream that already produced output can't be replayed transparently
+                delay = None if chunks else self._retry_delay(e, attempt)
+                if delay is None:
+                    self._record_failure(spec, e)
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            text = "".join(chunks)
+            self._record_call(spec, prompt_tokens, text, start)
+            return text
+
+    def invoke(self, inputs: dict, bypass: bool = False):
+        key_parts, text, cached = self._lookup(inputs, bypass)
+        if text is not None:
+            return cached
+        for tier in range(len(self.tiers)):
+            try:
+                return self._store(key_parts, self._call(inputs, tier), tier)
+            except Exception as e:
+                if not self._fall_back(tier, e):
+                    raise
+
+    async def ainvoke(self, inputs: dict, bypass: bool = False):
+        key_parts, text, cached = self._lookup(inputs, bypass)
+        if text is not None:
+            return cached
+        for tier in range(len(self.tiers)):
+            try:
+                return self._store(key_parts, await self._acall(inputs, tier), tier)
+            except Exception as e:
+                if not self._fall_back(tier, e):
+                    raise
+
+    async def astream(self, inputs: dict, on_token: Callable[[str], None], bypass: bool = False):
+        """Like ainvoke, but calls on_token with each text chunk as the model produces it.
+
+        A cache hit is delivered as a single chunk.
+        """
+        key_parts, text, cached = self._lookup(inputs, bypass)
+        if text is not None:
+            on_token(text)
+            return cached
+        streamed = False
+
+        def forward(chunk: str):
+            nonlocal streamed
+            streamed = True
+            on_token(chunk)
+
+        for tier in range(len(self.tiers)):
+            try:
+                return self._store(key_parts, await self._acall(inputs, tier, forward), tier)
+            except Exception as e:
+                if not self._fall_back(tier, e, streamed):
+                    raise
+
+    def stream(self, inputs: dict, bypass: bool = False) -> Iterator[str]:
+        """Yield text chunks; the full response is cached only if the stream completes"""
+        key_parts, text, cached = self._lookup(inputs, bypass)
+        if text is not None:
+            yield text
+            return
+        prompt_tokens = self._prompt_tokens(inputs)
+        for tier, chain in enumerate(self._text_chains):
+            spec = self.tiers[tier][0]
+            chunks = []
+            try:
+                for attempt in itertools.count():
+                    self.limiter.acquire_sync(prompt_tokens)
+                    start = time.perf_counter()
+                    try:
+                        with LLM_IN_FLIGHT.track():
+                            for chunk in chain.stream(inputs):
+                                chunks.append(chunk)
+                                yield chunk
+                    except Exception as e:
+                        delay = None if chunks else self._retry_delay(e, attempt)
+                        if delay is None:
+                            self._record_failure(spec, e)
+                            raise
+                        time.sleep(delay)
+                        continue
+                    self._record_call(spec, prompt_tokens, "".join(chunks), start)
+                    break
+            except Exception as e:
+                if not self._fall_back(tier, e, bool(chunks)):
+                    raise
+                continue
+            self._store(key_parts, "".join(chunks), tier)
+            return
@@ -0,0 +1,296 @@
+import os
+import time
+import atexit
+import asyncio
+import logging
+import posixpath
+import threading
+import subprocess
+from typing import Dict, List, Optional
+from utils import git_blob_sha, same_content
+from repo_index import FolderCollisionError, same_problem
+from manifest import (
+    SOLUTIONS_MANIFEST_ENABLED, LEGACY_MANIFEST_PATH, ManifestUpdate, folder_number, load_manifest, shard_path
+)
+from commit_builder import GITHUB_SKIP_UNCHANGED
+
+logger = logging.getLogger(__name__)
+
+# LOCAL GIT SETTINGS
+LOCAL_GIT_REMOTE = os.getenv("LOCAL_GIT_REMOTE", "origin")
+LOCAL_GIT_PUSH_INTERVAL = float(os.getenv("LOCAL_GIT_PUSH_INTERVAL", "60"))
+LOCAL_GIT_AUTHOR = os.getenv("LOCAL_GIT_AUTHOR", "LeetCode Agent <agent@localhost>")
+# Directory local repositories must live under; the HTTP API refuses the local backend when unset
+LOCAL_GIT_ROOT = os.getenv("LOCAL_GIT_ROOT", "")
+
+
+class LocalGitError(Exception):
+    """Raised when a git command against the local repository fails"""
+
+    def __init__(self, args: list, result: subprocess.CompletedProcess):
+        stderr = result.stderr.decode(errors="replace").strip()
+        super().__init__(f"git {' '.join(args)} failed ({result.returncode}): {stderr}")
+        self.returncode = result.returncode
+
+
+class LocalPathError(ValueError):
+    """Raised when a local repository path falls outside LOCAL_GIT_ROOT"""
+
+
+def resolve_local_path(path: str, root: Optional[str] = None) -> str:
+    """Absolute, symlink-resolved repository path; relative paths are taken from `root`.
+
+    With a `root` (default LOCAL_GIT_ROOT), anything resolving outside it (`..`, absolute
+    paths, symlinks) is rejected.
+    """
+    root = LOCAL_GIT_ROOT if root is None else root
+    if not root:
+        return os.path.realpath(os.path.expanduser(path))
+    root = os.path.realpath(os.path.expanduser(root))
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise LocalPathError(f"Local repository path must be inside {root}")
+    return resolved
+
+
+class LocalGitRepo:
+    """Drop-in for CommitBuilder that commits into a local clone or bare repository.
+
+    Each commit_files call becomes one local commit written with `git fast-import`, so
+    no index or working tree is involved and the cost is a single process per commit.
+    Commits accumulate locally and are pushed to `remote` at most once every
+    `push_interval` seconds (0 pushes after every commit, a negative value or a repo
+    without that remote never pushes), or right away via flush(). A missing path is
+    created as a bare repository, which makes the whole pipeline usable offline.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        branch: str = "main",
+        remote: str = LOCAL_GIT_REMOTE,
+        push_interval: float = LOCAL_GIT_PUSH_INTERVAL,
+        skip_unchanged: bool = GITHUB_SKIP_UNCHANGED,
+        manifest: bool = SOLUTIONS_MANIFEST_ENABLED
+    ):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.owner = "local"
+        self.repo = self.path
+        self.branch = branch
+        self.push_interval = push_interval
+        self.skip_unchanged = skip_unchanged
+        self.manifest = manifest
+        self.unpushed = 0
+        self.last_push: Optional[float] = None
+        self._lock = threading.Lock()
+        self._push_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+            self._git("init", "--bare", f"--initial-branch={branch}")
+            logger.info(f"📦 Created bare repository at {self.path}")
+        self.bare = self._git("rev-parse", "--is-bare-repository").strip() == "true"
+        self.remote = remote if remote in self._git("remote").split() else None
+
+    def _run(self, args: list, stdin: Optional[bytes] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=self.path, input=stdin, capture_output=True)
+
+    def _git(self, *args, stdin: Optional[bytes] = None) -> str:
+        result = self._run(list(args), stdin)
+        if result.returncode != 0:
+            raise LocalGitError(list(args), result)
+        return result.stdout.decode()
+
+    def _head(self) -> Optional[str]:
+        result = self._run(["rev-parse", "--verify", "--quiet", f"refs/heads/{self.branch}^{{commit}}"])
+        return result.stdout.decode().strip() if result.returncode == 0 else None
+
+    def _read_blob(self, spec: str) -> Optional[str]:
+        """Content of a blob given as <sha> or <commit>:<path>, or None if it doesn't exist"""
+        result = self._run(["cat-file", "blob", spec])
+        return result.stdout.decode() if result.returncode == 0 else None
+
+    def _list_files(self, ref: str, paths: List[str]) -> Dict[str, str]:
+        """{path: blob sha} for `paths` that exist at `ref`"""
+        out = self._git("ls-tree", "-r", "-z", ref, "--", *paths)
+        listing = {}
+        for entry in filter(None, out.split("\0")):
+            meta, path = entry.split("\t", 1)
+            listing[path] = meta.split()[2]
+        return listing
+
+    def _unchanged(self, head: str, files: Dict[str, str]) -> List[str]:
+        remote = self._list_files(head, list(files))
+        unchanged = []
+        for path, content in files.items():
+            sha = remote.get(path)
+            if sha is None:
+                continue
+            if sha == git_blob_sha(content) or (
+                path.endswith(".md") and same_content(self._read_blob(sha), content)
+            ):
+                unchanged.append(path)
+        return unchanged
+
+    def _check_collisions(self, head: Optional[str], problems: Dict[str, dict]):
+        # The manifest already records which problem each folder holds
+        if head is None:
+            return
+        shards = {}
+        for folder, problem in problems.items():
+            name = posixpath.relpath(folder, "solutions")
+            path = shard_path(folder_number(name))
+            if path not in shards:
+                text = self._read_blob(f"{head}:{path}")
+                if text is None:
+                    # Not migrated to shards yet
+                    text = self._read_blob(f"{head}:{LEGACY_MANIFEST_PATH}")
+                shards[path] = load_manifest(text)["problems"]
+            entry = shards[path].get(name)
+            if entry is None:
+                continue
+            existing = {"problem_number": entry.get("number"), "problem_name": entry["name"]}
+            if not same_problem(existing, problem) and self._list_files(head, [folder]):
+                raise FolderCollisionError(folder, existing, problem)
+
+    def _fast_import(self, head: Optional[str], files: Dict[str, Optional[str]], message: str) -> str:
+        name, _, email = LOCAL_GIT_AUTHOR.partition(" <")
+        body = message.encode()
+        stream = [
+            f"commit refs/heads/{self.branch}\n".encode(),
+            f"committer {name} <{email.rstrip('>')}> {int(time.time())} +0000\n".encode(),
+            f"data {len(body)}\n".encode(), body, b"\n"
+        ]
+        if head:
+            stream.append(f"from {head}\n".encode())
+        for path, content in files.items():
+            quoted = path.replace("\\", "\\\\").replace('"', '\\"')
+            if content is None:
+                stream.append(f'D "{quoted}"\n'.encode())
+                continue
+            data = content.encode()
+            stream += [f'M 100644 inline "{quoted}"\n'.encode(), f"data {len(data)}\n".encode(), data, b"\n"]
+        stream.append(b"done\n")
+        self._git("fast-import", "--quiet", "--done", stdin=b"".join(stream))
+        return self._head()
+
+    def _sync_worktree(self, head: Optional[str], commit_sha: str):
+        """Fast-forward the checked-out files of a non-bare clone to the new commit"""
+        if self.bare:
+            return
+        checked_out = self._run(["symbolic-ref", "--quiet", "HEAD"]).stdout.decode().strip()
+        if checked_out != f"refs/heads/{self.branch}":
+            return
+        trees = [head, commit_sha] if head else [commit_sha]
+        result = self._run(["read-tree", "-m", "-u", *trees])
+        if result.returncode != 0:
+            logger.warning(f"⚠️ Working copy not updated (local changes?): {result.stderr.decode().strip()}")
+
+    def _commit(self, files: Dict[str, str], message: str, problems: Optional[Dict[str, dict]]) -> dict:
+        with self._lock:
+            head = self._head()
+            all_paths = list(files)
+            if problems:
+                self._check_collisions(head, problems)
+            unchanged = self._unchanged(head, files) if head and self.skip_unchanged else []
+            changed = {path: content for path, content in files.items() if path not in unchanged}
+            if unchanged:
+                logger.info(f"⏭️ Skipping {len(unchanged)} unchanged files")
+            manifest = {}
+            if self.manifest and problems:
+                update = ManifestUpdate(problems, all_paths)
+                while missing := update.missing():
+                    update.load({path: self._read_blob(f"{head}:{path}") if head else None for path in missing})
+                manifest = update.files()
+            if not changed and not manifest:
+                return {"commit_sha": head, "files": [], "manifest": [], "unchanged": unchanged}
+            commit_sha = self._fast_import(head, {**changed, **manifest}, message)
+            self._sync_worktree(head, commit_sha)
+            with self._push_lock:
+                self.unpushed += 1
+        logger.info(f"📝 Committed {len(changed) + len(manifest)} files locally ({commit_sha[:8]})")
+        self._schedule_push()
+        return {"commit_sha": commit_sha, "files": list(changed), "manifest": list(manifest), "unchanged": unchanged}
+
+    async def commit_files(
+        self,
+        files: Dict[str, str],
+        message: str,
+        problems: Optional[Dict[str, dict]] = None
+    ) -> dict:
+        """Same contract as CommitBuilder.commit_files, committing to the local branch"""
+        return await asyncio.to_thread(self._commit, dict(files), message, problems)
+
+    async def read_file(self, path: str) -> Optional[str]:
+        """Content of `path` on the local branch, or None if it doesn't exist"""
+        return await asyncio.to_thread(self._read_blob, f"refs/heads/{self.branch}:{path}")
+
+    def _schedule_push(self):
+        if self.remote is None or self.push_interval < 0:
+            return
+        if self.push_interval == 0:
+            self.push()
+            return
+        with self._push_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.push_interval, self.push)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def push(self) -> bool:
+        """Push every local commit now; returns False if the push failed"""
+        with self._push_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.remote is None or not self.unpushed:
+                return True
+            pending = self.unpushed
+            result = self._run(["push", self.remote, f"refs/heads/{self.branch}:refs/heads/{self.branch}"])
+            if result.returncode != 0:
+                # Commits stay local; the next commit or flush tries again
+                logger.error(f"❌ Push to {self.remote} failed: {result.stderr.decode().strip()}")
+                return False
+            self.unpushed -= pending
+            self.last_push = time.time()
+        logger.info(f"🚀 Pushed {pending} commits to {self.remote}/{self.branch}")
+        return True
+
+    async def flush(self) -> bool:
+        return await asyncio.to_thread(self.push)
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "branch": self.branch,
+            "bare": self.bare,
+            "remote": self.remote,
+            "head": self._head(),
+            "unpushed_commits": self.unpushed,
+            "last_push": self.last_push
+        }
+
+
+_repos: Dict[tuple, LocalGitRepo] = {}
+_repos_lock = threading.Lock()
+
+
+def get_local_repo(path: str, branch: str = "main") -> LocalGitRepo:
+    """Return the shared LocalGitRepo for a path, so every caller batches into the same pushes"""
+    key = (resolve_local_path(path), branch)
+    with _repos_lock:
+        if key not in _repos:
+            _repos[key] = LocalGitRepo(key[0], branch)
+        return _repos[key]
+
+
+def flush_all() -> bool:
+    """Push every local repository with pending commits"""
+    with _repos_lock:
+        repos = list(_repos.values())
+    return all([repo.push() for repo in repos])
+
+
+# Don't leave commits behind when the process exits between push intervals
+atexit.register(flush_all)
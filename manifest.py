@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import posixpath
+from typing import Dict, List, Optional
+
+# MANIFEST SETTINGS
+SOLUTIONS_MANIFEST_ENABLED = os.getenv("SOLUTIONS_MANIFEST_ENABLED", "1") != "0"
+SOLUTIONS_DIR = "solutions"
+MANIFEST_DIR = f"{SOLUTIONS_DIR}/index"
+MANIFEST_PAGES_PATH = f"{MANIFEST_DIR}/pages.json"
+MANIFEST_README_PATH = f"{SOLUTIONS_DIR}/README.md"
+# Single-file index written by earlier versions; migrated into shards on the next push
+LEGACY_MANIFEST_PATH = f"{SOLUTIONS_DIR}/index.json"
+MANIFEST_SHARD_SIZE = 100
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+MANIFEST_VERSION = 2
+
+
+def tag_slug(tag: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", tag.lower()).strip("-") or "untagged"
+
+
+def folder_number(folder: str) -> Optional[int]:
+    """Problem number a solutions/ folder name starts with ("0001_two_sum" -> 1)"""
+    match = re.match(r"(\d+)_", folder)
+    return int(match.group(1)) if match else None
+
+
+def shard_path(number: Optional[int]) -> str:
+    """solutions/index/<bucket>.json holding the entries of problems numbered like `number`"""
+    if not number:
+        return f"{MANIFEST_DIR}/other.json"
+    return f"{MANIFEST_DIR}/{number // MANIFEST_SHARD_SIZE * MANIFEST_SHARD_SIZE:04d}.json"
+
+
+def load_manifest(text: Optional[str]) -> dict:
+    """Parse an index shard (or page member list), starting empty when it's missing or unreadable"""
+    try:
+        data = json.loads(text) if text else {}
+    except ValueError:
+        data = {}
+    return {"version": MANIFEST_VERSION, "problems": data.get("problems", {})}
+
+
+def dump_manifest(manifest: dict) -> str:
+    """Serialise with one problem per line, so each submission is a one-line diff"""
+    lines = [
+        f"{json.dumps(folder)}: {json.dumps(entry, sort_keys=True, ensure_ascii=False)}"
+        for folder, entry in sorted(manifest["problems"].items())
+    ]
+    body = ",\n".join(lines)
+    return f'{{"version": {manifest["version"]}, "problems": {{\n{body}\n}}}}\n'
+
+
+def entry_pages(entry: dict) -> Dict[str, str]:
+    """{page key: title} of the generated pages listing a problem: its difficulty and each tag"""
+    difficulty = entry["difficulty"] if entry.get("difficulty") in DIFFICULTIES else "Other"
+    pages = {f"difficulty/{difficulty.lower()}": difficulty}
+    for tag in entry.get("tags", []):
+        pages.setdefault(f"tags/{tag_slug(tag)}", tag)
+    return pages
+
+
+def page_path(key: str) -> str:
+    return f"{SOLUTIONS_DIR}/{key}.md"
+
+
+def page_members_path(key: str) -> str:
+    return f"{MANIFEST_DIR}/{key}.json"
+
+
+def _entry(problem: dict, old: dict, names: set) -> dict:
+    return {
+        "number": problem.get("problem_number"),
+        "name": problem["problem_name"],
+        "difficulty": problem.get("difficulty") or old.get("difficulty", ""),
+        "tags": sorted(set(problem.get("tags") or old.get("tags", []))),
+        "files": sorted(names | set(old.get("files", [])))
+    }
+
+
+def _cell(text) -> str:
+    return str(text).replace("|", "\\|")
+
+
+def _sort_key(item):
+    folder, entry = item
+    return (entry.get("number") is None, entry.get("number") or 0, entry["name"].lower(), folder)
+
+
+def _problem_row(folder: str, entry: dict, prefix: str, columns: tuple) -> str:
+    notes = next((f for f in entry["files"] if f.endswith(".md")), None)
+    name = _cell(entry["name"])
+    link = f"[{name}]({prefix}{folder}/{notes})" if notes else name
+    solutions = ", ".join(
+        f"[{posixpath.splitext(f)[1][1:]}]({prefix}{folder}/{f})"
+        for f in entry["files"] if not f.endswith(".md")
+    )
+    cells = {
+        "number": entry.get("number") or "",
+        "problem": link,
+        "difficulty": _cell(entry.get("difficulty", "")),
+        "tags": ", ".join(_cell(t) for t in entry["tags"]),
+        "solutions": solutions
+    }
+    return "| " + " | ".join(str(cells[c]) for c in columns) + " |"
+
+
+def _table(rows, prefix: str, columns: tuple) -> list:
+    header = {"number": "#", "problem": "Problem", "difficulty": "Difficulty", "tags": "Tags", "solutions": "Solutions"}
+    lines = ["| " + " | ".join(header[c] for c in columns) + " |", "|" + "---|" * len(columns)]
+    lines += [_problem_row(folder, entry, prefix, columns) for folder, entry in sorted(rows, key=_sort_key)]
+    return lines
+
+
+def render_readme(pages: Dict[str, dict]) -> str:
+    """solutions/README.md: problem counts and links to every difficulty and tag page"""
+    difficulties = [(d, pages.get(f"difficulty/{d.lower()}")) for d in DIFFICULTIES + ("Other",)]
+    difficulties = [(d, page["count"]) for d, page in difficulties if page]
+    total = sum(count for _, count in difficulties)
+    summary = " · ".join(f"{d}: {count}" for d, count in difficulties)
+    lines = [
+        "# Solutions",
+        "",
+        "<!-- Generated from index/ on every push; manual edits will be overwritten. -->",
+        "",
+        f"**{total} problems**" + (f" · {summary}" if summary else ""),
+        "",
+        "## By Difficulty",
+        ""
+    ]
+    lines += [f"- [{d}](difficulty/{d.lower()}.md) ({count})" for d, count in difficulties]
+    lines += ["", "## By Tag", "", "| Tag | Problems |", "|---|---|"]
+    for key, page in sorted(pages.items()):
+        if key.startswith("tags/"):
+            lines.append(f"| [{_cell(page['title'])}]({key}.md) | {page['count']} |")
+    return "\n".join(lines) + "\n"
+
+
+def render_page(key: str, title: str, problems: Dict[str, dict]) -> str:
+    """solutions/difficulty/<name>.md or solutions/tags/<tag>.md: the problems on one page"""
+    columns = ("number", "problem", "tags", "solutions") if key.startswith("difficulty/") else (
+        "number", "problem", "difficulty", "solutions"
+    )
+    lines = [
+        f"# {title}",
+        "",
+        f"<!-- Generated from ../index/{key}.json on every push; manual edits will be overwritten. -->",
+        "",
+        f"[← All solutions](../README.md) · {len(problems)} problems",
+        ""
+    ]
+    lines += _table(problems.items(), "../", columns)
+    return "\n".join(lines) + "\n"
+
+
+def _dump_pages(pages: Dict[str, dict]) -> str:
+    lines = [
+        f"{json.dumps(key)}: {json.dumps(page, sort_keys=True, ensure_ascii=False)}"
+        for key, page in sorted(pages.items())
+    ]
+    body = ",\n".join(lines)
+    return f'{{"version": {MANIFEST_VERSION}, "pages": {{\n{body}\n}}}}\n'
+
+
+class ManifestUpdate:
+    """The manifest files one commit adds, read and written shard by shard.
+
+    The index is split into solutions/index/<bucket>.json shards of MANIFEST_SHARD_SIZE
+    problem numbers, and every difficulty and tag page is rendered from its own member
+    list under solutions/index/. A submission only reads and rewrites its shard, the
+    pages it is (or was) listed on and the small page summary behind the README, so the
+    number of files a commit reads and writes doesn't grow with the repository.
+
+    Callers read the paths `missing()` asks for from the commit's parent (None when a
+    file doesn't exist), hand them to `load()`, and repeat until nothing is missing;
+    `files()` then returns {path: content}, where None deletes the path.
+    """
+
+    def __init__(self, problems: Dict[str, dict], files):
+        self.problems = {posixpath.relpath(folder, SOLUTIONS_DIR): problem for folder, problem in problems.items()}
+        self.paths = list(files)
+        self.texts: Dict[str, Optional[str]] = {}
+
+    def _shards(self) -> List[str]:
+        return list(dict.fromkeys(shard_path(folder_number(folder)) for folder in self.problems))
+
+    def missing(self) -> List[str]:
+        wanted = self._shards() + [MANIFEST_PAGES_PATH]
+        if all(path in self.texts for path in wanted):
+            if self.texts[MANIFEST_PAGES_PATH] is None:
+                # Not sharded yet: rebuild everything from the legacy index, if there is one
+                wanted.append(LEGACY_MANIFEST_PATH)
+            else:
+                for folder in self.problems:
+                    old = load_manifest(self.texts[shard_path(folder_number(folder))])["problems"].get(folder)
+                    wanted += [page_members_path(key) for key in entry_pages(old)] if old else []
+                    wanted += [page_members_path(key) for key in entry_pages(self._new_entry(folder, old or {}))]
+        return [path for path in dict.fromkeys(wanted) if path not in self.texts]
+
+    def load(self, texts: Dict[str, Optional[str]]):
+        self.texts.update(texts)
+
+    def _new_entry(self, folder: str, old: dict) -> dict:
+        names = {posixpath.basename(p) for p in self.paths if posixpath.dirname(p) == f"{SOLUTIONS_DIR}/{folder}"}
+        return _entry(self.problems[folder], old, names)
+
+    def files(self) -> Dict[str, Optional[str]]:
+        """{path: content, or None to delete it}; {} when the index already covers these problems"""
+        if self.texts[MANIFEST_PAGES_PATH] is None:
+            return self._rebuild()
+        shards = {path: load_manifest(self.texts[path]) for path in self._shards()}
+        pages = json.loads(self.texts[MANIFEST_PAGES_PATH]).get("pages", {})
+        members: Dict[str, Dict[str, dict]] = {}
+        for folder in self.problems:
+            shard = shards[shard_path(folder_number(folder))]["problems"]
+            old = shard.get(folder)
+            new = shard[folder] = self._new_entry(folder, old or {})
+            for key, title in (entry_pages(old) if old else {}).items():
+                members.setdefault(key, load_manifest(self.texts[page_members_path(key)])["problems"]).pop(folder, None)
+                pages.setdefault(key, {"title": title})
+            for key, title in entry_pages(new).items():
+                members.setdefault(key, load_manifest(self.texts[page_members_path(key)])["problems"])[folder] = new
+                pages.setdefault(key, {"title": title})
+
+        updates = {path: dump_manifest(shard) for path, shard in shards.items()}
+        if all(updates[path] == self.texts[path] for path in updates):
+            return {}
+        return {**updates, **self._pages(members, pages)}
+
+    def _rebuild(self) -> Dict[str, Optional[str]]:
+        legacy = self.texts.get(LEGACY_MANIFEST_PATH)
+        problems = load_manifest(legacy)["problems"]
+        for folder in self.problems:
+            problems[folder] = self._new_entry(folder, problems.get(folder, {}))
+        shards: Dict[str, dict] = {}
+        members: Dict[str, Dict[str, dict]] = {}
+        pages: Dict[str, dict] = {}
+        for folder, entry in sorted(problems.items()):
+            shards.setdefault(shard_path(folder_number(folder)), load_manifest(None))["problems"][folder] = entry
+            for key, title in entry_pages(entry).items():
+                members.setdefault(key, {})[folder] = entry
+                pages.setdefault(key, {"title": title})
+        updates = {path: dump_manifest(shard) for path, shard in shards.items()}
+        if legacy is not None:
+            updates[LEGACY_MANIFEST_PATH] = None
+        return {**updates, **self._pages(members, pages)}
+
+    @staticmethod
+    def _pages(members: Dict[str, Dict[str, dict]], pages: Dict[str, dict]) -> Dict[str, Optional[str]]:
+        """Member lists and pages for the changed pages, plus the summary and README"""
+        updates: Dict[str, Optional[str]] = {}
+        for key, problems in members.items():
+            if problems:
+                pages[key]["count"] = len(problems)
+                updates[page_members_path(key)] = dump_manifest({"version": MANIFEST_VERSION, "problems": problems})
+                updates[page_path(key)] = render_page(key, pages[key]["title"], problems)
+            else:
+                # Nothing is listed there any more
+                pages.pop(key, None)
+                updates[page_members_path(key)] = None
+                updates[page_path(key)] = None
+        updates[MANIFEST_PAGES_PATH] = _dump_pages(pages)
+        updates[MANIFEST_README_PATH] = render_readme(pages)
+        return updates
+
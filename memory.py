@@ -0,0 +1,104 @@
+import os
+from typing import List, Optional
+from models import Explanation
+from llm_cache import CachedChain
+from rate_limit import estimate_tokens
+import prompts
+
+# CHAT MEMORY SETTINGS
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "4000"))
+CHAT_MIN_RECENT_TURNS = int(os.getenv("CHAT_MIN_RECENT_TURNS", "2"))
+
+
+def code_context(code: str, language: str) -> str:
+    return f"Current Solution ({language}):\n```\n{code}\n```"
+
+
+def explanation_context(explanation: Explanation, language: str) -> str:
+    parts = [f"Solution Notes ({language}, from the generated explanation):\n{explanation.explanation or ''}"]
+    if explanation.approach is not None:
+        approach = "\n".join(f"{i}. {step}" for i, step in enumerate(explanation.approach, 1))
+        parts.append(f"Approach:\n{approach}")
+    if explanation.algorithm is not None:
+        parts.append(f"Algorithm:\n{explanation.algorithm}")
+    if explanation.time_complexity is not None:
+        parts.append(f"Time: {explanation.time_complexity}\nSpace: {explanation.space_complexity}")
+    return "\n\n".join(parts)
+
+
+class ConversationMemory:
+    """Chat history kept within a prompt token budget.
+
+    Recent turns are sent verbatim; once they no longer fit, the oldest ones are
+    folded into a rolling summary by the LLM. At least `min_recent_turns` turns
+    always stay verbatim.
+    """
+
+    def __init__(self, token_budget: int = CHAT_TOKEN_BUDGET, min_recent_turns: int = CHAT_MIN_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.min_recent_turns = min_recent_turns
+        self.summary = ""
+        self.turns: List[dict] = []
+        self._full_history_tokens = 0
+
+    @staticmethod
+    def _format_turns(turns: List[dict]) -> str:
+        return "".join(f"Student: {t['question']}\nTutor: {t['answer']}\n\n" for t in turns)
+
+    def history_text(self) -> str:
+        history = ""
+        if self.summary:
+            history += f"Summary of the earlier conversation:\n{self.summary}\n\n"
+        if self.turns:
+            history += f"Recent conversation:\n{self._format_turns(self.turns)}"
+        return history
+
+    def build_inputs(
+        self,
+        question: str,
+        problem_statement: str,
+        code: str,
+        language: str,
+        explanation: Optional[Explanation] = None
+    ) -> dict:
+        """chat_prompt inputs, using the explanation instead of raw code when it is shorter"""
+        solution_context = code_context(code, language)
+        if explanation is not None:
+            notes = explanation_context(explanation, language)
+            if estimate_tokens(notes) < estimate_tokens(solution_context):
+                solution_context = notes
+        return {
+            "problem_statement": problem_statement,
+            "solution_context": solution_context,
+            "history": self.history_text(),
+            "question": question
+        }
+
+    def usage(self, inputs: dict, code: str, language: str) -> dict:
+        """Prompt tokens for this turn vs. re-sending raw code plus the whole conversation"""
+        prompt_tokens = estimate_tokens(prompts.chat_prompt.format(**inputs))
+        full_inputs = {**inputs, "solution_context": code_context(code, language), "history": ""}
+        full_context_tokens = estimate_tokens(prompts.chat_prompt.format(**full_inputs)) + self._full_history_tokens
+        return {"prompt_tokens": prompt_tokens, "full_context_tokens": full_context_tokens}
+
+    def add_turn(self, question: str, answer: str):
+        turn = {"question": question, "answer": answer}
+        self.turns.append(turn)
+        self._full_history_tokens += estimate_tokens(self._format_turns([turn]))
+
+    def compact(self, llm_instance, inputs: dict):
+        """Fold the oldest turns into the summary until the next prompt fits the budget"""
+        fixed_tokens = estimate_tokens(prompts.chat_prompt.format(**{**inputs, "history": "", "question": ""}))
+        available = self.token_budget - fixed_tokens
+
+        overflow = []
+        while len(self.turns) > self.min_recent_turns and estimate_tokens(self.history_text()) > available:
+            overflow.append(self.turns.pop(0))
+        if not overflow:
+            return
+
+        summarize = CachedChain(prompts.summary_prompt, llm_instance, stage="summary")
+        self.summary = summarize.invoke({
+            "summary": self.summary or "(none yet)",
+            "turns": self._format_turns(overflow)
+        }).strip()
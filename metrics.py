@@ -0,0 +1,240 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# METRICS SETTINGS
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+STREAMLIT_METRICS_PORT = int(os.getenv("STREAMLIT_METRICS_PORT", "0"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self._values: Dict[tuple, float] = {}
+        super().__init__(name, documentation, labels)
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[tuple, list] = {}
+        super().__init__(name, documentation, labels)
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts..., sum, count]
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(state[-2], 6))}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# PIPELINE METRICS
+STAGE_DURATION = Histogram("leetcode_stage_duration_seconds", "Pipeline stage latency", ("stage",))
+STAGE_FAILURES = Counter("leetcode_stage_failures_total", "Pipeline stages that raised", ("stage",))
+STAGE_IN_FLIGHT = Gauge("leetcode_stage_in_flight", "Pipeline stages currently running", ("stage",))
+
+# UPSTREAM METRICS
+GITHUB_DURATION = Histogram(
+    "leetcode_github_request_duration_seconds", "GitHub API request latency",
+    ("method", "endpoint", "status")
+)
+GITHUB_IN_FLIGHT = Gauge("leetcode_github_requests_in_flight", "GitHub API requests currently open")
+LLM_DURATION = Histogram(
+    "leetcode_llm_request_duration_seconds", "LLM call latency (cache misses only)", ("stage", "model")
+)
+LLM_CALLS = Counter(
+    "leetcode_llm_calls_total", "LLM calls by stage, model and outcome (ok/invalid/error/timeout)",
+    ("stage", "model", "outcome")
+)
+LLM_IN_FLIGHT = Gauge("leetcode_llm_requests_in_flight", "LLM calls currently running")
+LLM_TOKENS = Counter("leetcode_llm_tokens_total", "Estimated LLM tokens by kind (prompt/completion)", ("kind",))
+LLM_CACHE_LOOKUPS = Counter("leetcode_llm_cache_lookups_total", "LLM cache lookups by result (hit/miss)", ("result",))
+RETRIES = Counter("leetcode_retries_total", "Rate-limited calls retried, by upstream", ("upstream",))
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a pipeline stage, counting it in flight while it runs and as failed if it raises"""
+    start = time.perf_counter()
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+
+
+def github_endpoint(path: str) -> str:
+    """Collapse a REST path to a low-cardinality label, e.g. /repos/o/r/git/blobs/abc -> git/blobs"""
+    parts = [p for p in path.split("?")[0].split("/") if p]
+    if parts[:1] == ["repos"]:
+        parts = parts[3:]
+        return "/".join(parts[:2]) if parts[:1] == ["git"] else (parts[0] if parts else "repo")
+    return parts[0] if parts else "root"
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+_server: Optional[object] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = STREAMLIT_METRICS_PORT) -> bool:
+    """Serve /metrics from a daemon thread, for processes without FastAPI (Streamlit).
+
+    Safe to call on every script rerun; only the first call binds the port. Returns
+    False when port is 0 (disabled).
+    """
+    global _server
+    if not port:
+        return False
+    with _server_lock:
+        if _server is not None:
+            return True
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if not self.path.startswith("/metrics"):
+                    self.send_error(404)
+                    return
+                body = render_metrics().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-server").start()
+    return True
@@ -1,5 +1,6 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from typing import List, Literal, Optional, Type, get_args
+from pydantic import BaseModel, Field, create_model, model_validator
 from fastapi import Form
 
 class Example(BaseModel):
@@ -16,27 +17,69 @@ class ProblemDetails(BaseModel):
     output_description: str
     examples: List[Example]
 
+class ProblemJudgment(BaseModel):
+    """The ProblemDetails fields that need the LLM once examples/constraints are parsed locally"""
+    problem_name: str
+    difficulty: str
+    tags: List[str] = Field(description="Tags like array, hash-table, dynamic-programming etc")
+    input_description: str
+    output_description: str
+
 class Explanation(BaseModel):
-    explanation: str = Field(description="Detailed explanation in 3-4 lines")
-    key_insights: List[str] = Field(description="3-5 key insights about the problem and solution")
-    hints: List[str] = Field(description="5-6 hints with bold key concepts")
-    algorithm: str = Field(description="Full algorithm with proper formatting, indentation, pseudocode")
-    approach: List[str] = Field(description="Step by step approach points")
-    walkthrough: str = Field(description="Visual step-by-step walkthrough with examples")
-    time_complexity: str = Field(description="Time complexity with detailed explanation")
-    space_complexity: str = Field(description="Space complexity with detailed explanation")
-    edge_cases: List[str] = Field(description="Important edge cases")
+    """Generated notes sections; the ones left out of the note profile stay None"""
+    explanation: Optional[str] = Field(None, description="Detailed explanation in 3-4 lines")
+    key_insights: Optional[List[str]] = Field(None, description="3-5 key insights about the problem and solution")
+    hints: Optional[List[str]] = Field(None, description="5-6 hints with bold key concepts")
+    algorithm: Optional[str] = Field(None, description="Full algorithm with proper formatting, indentation, pseudocode")
+    approach: Optional[List[str]] = Field(None, description="Step by step approach points")
+    walkthrough: Optional[str] = Field(None, description="Visual step-by-step walkthrough with examples")
+    time_complexity: Optional[str] = Field(None, description="Time complexity with detailed explanation")
+    space_complexity: Optional[str] = Field(None, description="Space complexity with detailed explanation")
+    edge_cases: Optional[List[str]] = Field(None, description="Important edge cases")
+
+@lru_cache(maxsize=None)
+def explanation_model(
+    fields: tuple,
+    base: Optional[Type[BaseModel]] = None,
+    name: str = "Explanation",
+    doc: Optional[str] = None
+) -> Type[BaseModel]:
+    """Model requiring exactly `fields` of Explanation, after `base`'s own fields.
+
+    This is the schema the LLM is asked to fill for a note profile; single-call analysis
+    passes ProblemDetails or ProblemJudgment as `base` to merge both into one object.
+    """
+    definitions = {}
+    for field in fields:
+        info = Explanation.model_fields[field]
+        annotation = next(arg for arg in get_args(info.annotation) if arg is not type(None))
+        definitions[field] = (annotation, Field(description=info.description))
+    return create_model(name, __base__=base, __doc__=doc, **definitions)
 
 class GithubConfig(BaseModel):
-    github_token: str
+    github_token: str = ""
     github_username: str
     github_repo: str = "leetcode-solutions"
+    # "local" commits into a clone or bare repo at local_path and pushes in batches
+    backend: Literal["github", "local"] = "github"
+    local_path: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_backend(self):
+        if self.backend == "github" and not self.github_token:
+            raise ValueError("github_token is required for the github backend")
+        if self.backend == "local" and not self.local_path:
+            raise ValueError("local_path is required for the local backend")
+        return self
 
 class LeetcodeSolution(BaseModel):
     problem_statement: str = Field(...)
     code: str = Field(...)
     language: str = Field(default="python")
     problem_name: Optional[str] = None
+    bypass_cache: bool = False
+    # Notes sections to generate up front; None uses NOTE_PROFILE
+    note_profile: Optional[Literal["lite", "standard", "full"]] = None
 
     @classmethod
     def as_form(
@@ -44,11 +87,15 @@ class LeetcodeSolution(BaseModel):
         problem_statement: str = Form(...),
         code: str = Form(...),
         language: str = Form("python"),
-        problem_name: str = Form(None)
+        problem_name: str = Form(None),
+        bypass_cache: bool = Form(False),
+        note_profile: Optional[Literal["lite", "standard", "full"]] = Form(None)
     ):
         return cls(
             problem_statement=problem_statement,
             code=code,
             language=language,
-            problem_name=problem_name
+            problem_name=problem_name,
+            bypass_cache=bypass_cache,
+            note_profile=note_profile
         )
@@ -0,0 +1,126 @@
+import os
+from typing import Dict, List, Optional
+
+# NOTE PROFILE SETTINGS
+NOTE_PROFILE = os.getenv("NOTE_PROFILE", "standard")
+
+# Generated sections in the order they appear in the notes, with the Explanation fields behind each
+NOTE_SECTIONS: Dict[str, dict] = {
+    "explanation": {"fields": ["explanation"], "heading": "## 💡 Explanation"},
+    "key_insights": {"fields": ["key_insights"], "heading": "## 🔑 Key Insights"},
+    "hints": {"fields": ["hints"], "heading": "## 🎯 Hints"},
+    "algorithm": {"fields": ["algorithm"], "heading": "## 🔍 Algorithm"},
+    "approach": {"fields": ["approach"], "heading": "## 📋 Approach"},
+    "walkthrough": {"fields": ["walkthrough"], "heading": "## 🚶 Step-by-Step Walkthrough"},
+    "complexity": {"fields": ["time_complexity", "space_complexity"], "heading": "## 📊 Complexity Analysis"},
+    "edge_cases": {"fields": ["edge_cases"], "heading": "## ⚠️ Edge Cases"}
+}
+STATEMENT_HEADING = "## 📝 Problem Statement"
+EXAMPLES_HEADING = "## 📥 Examples"
+
+# The walkthrough dominates output tokens, so only "full" asks for it up front
+NOTE_PROFILES: Dict[str, List[str]] = {
+    "lite": ["explanation", "key_insights", "complexity"],
+    "standard": ["explanation", "key_insights", "hints", "algorithm", "approach", "complexity", "edge_cases"],
+    "full": list(NOTE_SECTIONS)
+}
+
+
+class NoteNotFoundError(LookupError):
+    """Raised when a problem's notes or solution file can't be found in the repository"""
+
+
+def profile_sections(profile: Optional[str] = None) -> tuple:
+    """Section names of a note profile (NOTE_PROFILE when None), in note order"""
+    name = profile or NOTE_PROFILE
+    if name not in NOTE_PROFILES:
+        raise ValueError(f"Unknown note profile {name!r}; expected one of {', '.join(NOTE_PROFILES)}")
+    return tuple(NOTE_PROFILES[name])
+
+
+def section_fields(sections) -> tuple:
+    return tuple(field for name in NOTE_SECTIONS if name in sections for field in NOTE_SECTIONS[name]["fields"])
+
+
+def present_sections(explanation) -> List[str]:
+    """Sections whose fields were generated"""
+    return [
+        name for name, section in NOTE_SECTIONS.items()
+        if all(getattr(explanation, field) is not None for field in section["fields"])
+    ]
+
+
+def _numbered(items: list) -> str:
+    return "".join(f"{i}. {item}\n" for i, item in enumerate(items, 1))
+
+
+def render_section(name: str, explanation) -> str:
+    """Markdown for one section, from its heading up to where the next heading starts"""
+    e = explanation
+    if name in ("key_insights", "hints", "approach"):
+        body = _numbered(getattr(e, name))
+    elif name == "algorithm":
+        body = f"```\n{e.algorithm}\n```\n"
+    elif name == "complexity":
+        body = f"### Time Complexity\n{e.time_complexity}\n\n### Space Complexity\n{e.space_complexity}\n"
+    elif name == "edge_cases":
+        body = "".join(f"- {edge_case}\n" for edge_case in e.edge_cases)
+    else:
+        body = f"{getattr(e, name)}\n"
+    return f"{NOTE_SECTIONS[name]['heading']}\n\n{body}\n---\n\n"
+
+
+def _heading_offset(notes: str, heading: str) -> int:
+    if notes.startswith(heading + "\n"):
+        return 0
+    offset = notes.find("\n" + heading + "\n")
+    return offset + 1 if offset >= 0 else -1
+
+
+def notes_sections(notes: str) -> List[str]:
+    """Sections already present in a rendered notes file"""
+    return [name for name, section in NOTE_SECTIONS.items() if _heading_offset(notes, section["heading"]) >= 0]
+
+
+def _section_span(notes: str, name: str) -> tuple:
+    """(start, end) of section `name`; start is -1 when it's missing and end is where it would go.
+
+    Only the known section headings (and the examples heading) are treated as
+    boundaries, so generated Markdown with its own `##` headings stays intact.
+    """
+    names = list(NOTE_SECTIONS)
+    boundaries = [NOTE_SECTIONS[other]["heading"] for other in names[names.index(name) + 1:]] + [EXAMPLES_HEADING]
+    following = [offset for offset in (_heading_offset(notes, h) for h in boundaries) if offset >= 0]
+    end = min(following) if following else len(notes)
+    return _heading_offset(notes, NOTE_SECTIONS[name]["heading"]), end
+
+
+def _put_section(notes: str, name: str, text: str) -> str:
+    start, end = _section_span(notes, name)
+    if start < 0:
+        start = end
+    return notes[:start] + text + notes[end:]
+
+
+def patch_notes(notes: str, name: str, explanation) -> str:
+    """Insert or replace section `name` of a rendered notes file, keeping the section order"""
+    return _put_section(notes, name, render_section(name, explanation))
+
+
+def keep_sections(previous: str, notes: str) -> str:
+    """`notes` plus the sections of `previous` it doesn't have, e.g. ones added on demand"""
+    for name in notes_sections(previous):
+        if _heading_offset(notes, NOTE_SECTIONS[name]["heading"]) < 0:
+            start, end = _section_span(previous, name)
+            notes = _put_section(notes, name, previous[start:end])
+    return notes
+
+
+def notes_problem_statement(notes: str) -> Optional[str]:
+    """The Problem Statement section of a rendered notes file, including input/output"""
+    start = _heading_offset(notes, STATEMENT_HEADING)
+    if start < 0:
+        return None
+    start += len(STATEMENT_HEADING)
+    end = notes.find("\n---\n", start)
+    return notes[start:end if end >= 0 else len(notes)].strip()
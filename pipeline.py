@@ -0,0 +1,589 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional
+from utils import (
+    get_file_extension, get_folder_and_filename, create_solution_file, create_notes,
+    parse_problem_statement, strip_examples, format_problem_statement
+)
+from models import Example, ProblemDetails, ProblemJudgment, Explanation
+from notes import (
+    NOTE_SECTIONS, NoteNotFoundError, profile_sections, notes_sections, patch_notes, keep_sections,
+    notes_problem_statement
+)
+from llm_cache import CachedChain
+from catalog import get_catalog
+from checkpoints import Checkpoint, open_checkpoint
+from manifest import LEGACY_MANIFEST_PATH, folder_number, load_manifest, shard_path
+from rate_limit import request_priority, PRIORITY_INTERACTIVE
+from metrics import track_stage
+import prompts
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+
+# SINGLE-CALL ANALYSIS SETTINGS
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "0") != "0"
+COMBINED_MAX_CHARS = int(os.getenv("COMBINED_MAX_CHARS", "4000"))
+
+STAGE_ERROR_MESSAGES = {
+    "analysis": "Failed to analyze solution",
+    "extraction": "Failed to extract problem details",
+    "explanation": "Failed to generate explanation",
+    "rendering": "Failed to render files",
+    "push": "GitHub upload failed"
+}
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails; keeps the stage name for error reporting"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+    def describe(self) -> str:
+        return f"{STAGE_ERROR_MESSAGES.get(self.stage, self.stage)}: {self.error}"
+
+
+async def _run_stage(stage: str, coro, timings: Optional[dict] = None):
+    start = time.perf_counter()
+    try:
+        with track_stage(stage):
+            return await coro
+    except Exception as e:
+        raise StageError(stage, e) from e
+    finally:
+        if timings is not None:
+            timings[stage] = round(time.perf_counter() - start, 3)
+
+
+async def extract_problem_details(llm_instance, problem_statement: str, bypass_cache: bool = False) -> ProblemDetails:
+    """Extract ProblemDetails, parsing title, examples and constraints locally when possible.
+
+    For standard LeetCode text the LLM only classifies the statement (name, difficulty,
+    tags, input/output descriptions) instead of re-emitting it; anything the pre-parser
+    can't handle goes through the full extraction prompt.
+    """
+    parsed = parse_problem_statement(problem_statement)
+    if parsed is None:
+        problem_chain = CachedChain(prompts.problem_prompt, llm_instance, prompts.problem_parser, stage="extraction")
+        return await problem_chain.ainvoke({"problem_statement": problem_statement}, bypass=bypass_cache)
+
+    judgment_chain = CachedChain(
+        prompts.problem_judgment_prompt, llm_instance, prompts.problem_judgment_parser, stage="classification"
+    )
+    judgment = await judgment_chain.ainvoke(
+        {"problem_statement": strip_examples(problem_statement)}, bypass=bypass_cache
+    )
+    return details_from_judgment(parsed, judgment)
+
+
+def details_from_judgment(parsed: dict, judgment: ProblemJudgment) -> ProblemDetails:
+    """ProblemDetails from a locally parsed statement plus the LLM's classification"""
+    return ProblemDetails(
+        problem_number=parsed["problem_number"],
+        problem_name=parsed["problem_name"] or judgment.problem_name,
+        difficulty=parsed["difficulty"] or judgment.difficulty,
+        tags=judgment.tags,
+        original_statement=format_problem_statement(parsed),
+        input_description=judgment.input_description,
+        output_description=judgment.output_description,
+        examples=[Example(input=e["input"], output=e["output"]) for e in parsed["examples"]]
+    )
+
+
+def _split(result, model):
+    return model.model_validate(result.model_dump(include=set(model.model_fields)))
+
+
+async def analyze_combined(
+    llm_instance,
+    problem_statement: str,
+    code: str,
+    language: str,
+    bypass_cache: bool = False,
+    sections: Optional[tuple] = None
+) -> tuple:
+    """Extract ProblemDetails and generate the Explanation with one LLM call.
+
+    The prompt carries the statement once and one merged schema: the classification
+    fields when the statement parses locally, the full ProblemDetails otherwise.
+    """
+    sections = sections or profile_sections()
+    parsed = parse_problem_statement(problem_statement)
+    inputs = {"problem_statement": problem_statement, "code": code, "language": language}
+    if parsed is None:
+        prompt, parser = prompts.explanation_chain(sections, "combined")
+        result = await CachedChain(prompt, llm_instance, parser, stage="analysis").ainvoke(inputs, bypass=bypass_cache)
+        problem_details = _split(result, ProblemDetails)
+    else:
+        prompt, parser = prompts.explanation_chain(sections, "combined_judgment")
+        result = await CachedChain(prompt, llm_instance, parser, stage="analysis").ainvoke(inputs, bypass=bypass_cache)
+        problem_details = details_from_judgment(parsed, _split(result, ProblemJudgment))
+    return problem_details, _split(result, Explanation)
+
+
+async def analyze_solution(
+    llm_instance,
+    problem_statement: str,
+    code: str,
+    language: str,
+    bypass_cache: bool = False,
+    timings: Optional[dict] = None,
+    on_extracted: Optional[Callable] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    problem_name: Optional[str] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    sections: Optional[tuple] = None
+) -> tuple:
+    """Run problem extraction and explanation generation concurrently.
+
+    The explanation only needs the raw statement, so both LLM calls start at once and
+    the latency is the slower of the two. If one stage fails the other is cancelled.
+    Per-stage durations in seconds are written to `timings` when given. on_extracted
+    receives the ProblemDetails as soon as extraction finishes, and on_token switches
+    the explanation to streaming and receives its raw text chunks.
+
+    Problems already in the local catalog (matched on `problem_name` or the statement's
+    first line) skip the extraction LLM call; new extractions are added to it. With a
+    `checkpoint`, stages saved by an earlier failed attempt are reused as-is.
+
+    With COMBINED_ANALYSIS=1, short uncataloged statements go through analyze_combined
+    instead, falling back to the two calls if its response doesn't validate. Streaming
+    (on_token) always uses the two calls so extraction can be reported first.
+
+    Only the notes `sections` (default: the NOTE_PROFILE profile) are generated; the
+    other Explanation fields stay None and can be added later with fill_note_section.
+    """
+    sections = sections or profile_sections()
+    catalog = get_catalog()
+    if COMBINED_ANALYSIS and on_token is None and len(problem_statement) <= COMBINED_MAX_CHARS:
+        saved = checkpoint is not None and ("extraction" in checkpoint.stages or "explanation" in checkpoint.stages)
+        known = catalog is not None and not bypass_cache and catalog.lookup(problem_name, problem_statement) is not None
+        if not saved and not known:
+            try:
+                problem_details, explanation = await _run_stage("analysis", analyze_combined(
+                    llm_instance, problem_statement, code, language, bypass_cache, sections
+                ), timings)
+            except StageError as e:
+                logger.warning(f"⚠️ Single-call analysis failed, using separate calls: {str(e.error).splitlines()[0]}")
+            else:
+                if catalog is not None:
+                    catalog.put(problem_details)
+                if checkpoint:
+                    checkpoint.save("extraction", problem_details.model_dump())
+                    checkpoint.save("explanation", explanation.model_dump())
+                if on_extracted:
+                    on_extracted(problem_details)
+                return problem_details, explanation
+
+    explain_prompt, explain_parser = prompts.explanation_chain(sections)
+    explain_chain = CachedChain(explain_prompt, llm_instance, explain_parser, stage="explanation")
+    explain_inputs = {
+        "problem_statement": problem_statement,
+        "code": code,
+        "language": language
+    }
+
+    async def extract():
+        saved = checkpoint.get("extraction") if checkpoint else None
+        if saved is not None:
+            problem_details = ProblemDetails.model_validate(saved)
+        else:
+            problem_details = await lookup_or_extract()
+            if checkpoint:
+                checkpoint.save("extraction", problem_details.model_dump())
+        if on_extracted:
+            on_extracted(problem_details)
+        return problem_details
+
+    async def lookup_or_extract():
+        problem_details = None
+        if catalog is not None and not bypass_cache:
+            problem_details = catalog.lookup(problem_name, problem_statement)
+        if problem_details is not None:
+            logger.info(f"📚 Catalog hit: {problem_details.problem_name}")
+            parsed = parse_problem_statement(problem_statement)
+            if parsed is not None:
+                problem_details = problem_details.model_copy(
+                    update={"original_statement": format_problem_statement(parsed)}
+                )
+        else:
+            problem_details = await extract_problem_details(llm_instance, problem_statement, bypass_cache)
+            if catalog is not None:
+                catalog.put(problem_details)
+        return problem_details
+
+    async def explain():
+        saved = checkpoint.get("explanation") if checkpoint else None
+        if saved is not None:
+            return Explanation.model_validate(saved)
+        if on_token:
+            result = await explain_chain.astream(explain_inputs, on_token, bypass=bypass_cache)
+        else:
+            result = await explain_chain.ainvoke(explain_inputs, bypass=bypass_cache)
+        explanation = Explanation.model_validate(result.model_dump())
+        if checkpoint:
+            checkpoint.save("explanation", explanation.model_dump())
+        return explanation
+
+    extraction = asyncio.ensure_future(_run_stage("extraction", extract(), timings))
+    explanation = asyncio.ensure_future(_run_stage("explanation", explain(), timings))
+
+    try:
+        problem_details, explanation_result = await asyncio.gather(extraction, explanation)
+        return problem_details, explanation_result
+    finally:
+        for task in (extraction, explanation):
+            task.cancel()
+
+
+def render_solution_files(
+    problem_details,
+    explanation,
+    code: str,
+    language: str,
+    checkpoint: Optional[Checkpoint] = None
+) -> tuple:
+    """Render the code and notes files for a submission; returns (folder, {path: content}).
+
+    A checkpointed rendering is returned unchanged, so a retried push sends byte-identical
+    files (the notes carry a generation timestamp).
+    """
+    saved = checkpoint.get("rendering") if checkpoint else None
+    if saved is not None:
+        return saved["folder"], dict(saved["files"])
+    extension = get_file_extension(language)
+    folder, filename = get_folder_and_filename(
+        problem_details.problem_number,
+        problem_details.problem_name,
+        extension
+    )
+    notes_filename = filename.replace(f".{extension}", ".md")
+    files = {
+        f"solutions/{folder}/{filename}": create_solution_file(code, language),
+        f"solutions/{folder}/{notes_filename}": create_notes(problem_details, explanation)
+    }
+    if checkpoint:
+        checkpoint.save("rendering", {"folder": folder, "files": dict(files)})
+    return folder, files
+
+
+async def translate_solution(
+    llm_instance,
+    code: str,
+    language: str,
+    target_languages: list,
+    concurrency: int = TRANSLATION_CONCURRENCY,
+    bypass_cache: bool = False,
+    checkpoint: Optional[Checkpoint] = None
+) -> dict:
+    """Translate the code into every target language, at most `concurrency` at a time.
+
+    Returns {language: {"code": ...}} for successes and {language: {"error": ...}} for
+    failures, so one bad translation doesn't sink the rest. Successful translations are
+    checkpointed per language, so a retry only redoes the failed ones.
+    """
+    translation_chain = CachedChain(prompts.translation_prompt, llm_instance, stage="translation")
+    slots = asyncio.Semaphore(concurrency)
+    targets = [lang for lang in dict.fromkeys(target_languages or []) if lang != language]
+
+    async def translate(target_lang: str) -> dict:
+        stage = f"translation:{target_lang}"
+        saved = checkpoint.get(stage) if checkpoint else None
+        if saved is not None:
+            return {"code": saved["code"]}
+        async with slots:
+            try:
+                with track_stage("translation"):
+                    translated_code = await translation_chain.ainvoke({
+                        "source_language": language,
+                        "target_language": target_lang,
+                        "code": code
+                    }, bypass=bypass_cache)
+            except Exception as e:
+                return {"error": str(e)}
+        if checkpoint:
+            checkpoint.save(stage, {"code": translated_code})
+        return {"code": translated_code}
+
+    results = await asyncio.gather(*(translate(lang) for lang in targets))
+    return dict(zip(targets, results))
+
+
+def render_translation_files(problem_details, folder: str, translations: dict) -> dict:
+    """Render successful translations as {path: content} inside the solution folder"""
+    files = {}
+    for target_lang, result in translations.items():
+        if "code" not in result:
+            continue
+        # Use same filename base but different extension
+        _, target_filename = get_folder_and_filename(
+            problem_details.problem_number,
+            problem_details.problem_name,
+            get_file_extension(target_lang)
+        )
+        target_path = f"solutions/{folder}/{target_filename}"
+        result["path"] = target_path
+        files[target_path] = create_solution_file(result["code"], target_lang)
+    return files
+
+
+def folder_owner(folder: str, problem_details) -> dict:
+    """commit_files `problems` entry recording which problem a solutions/ folder belongs to"""
+    return {
+        f"solutions/{folder}": {
+            "problem_number": problem_details.problem_number,
+            "problem_name": problem_details.problem_name,
+            "difficulty": problem_details.difficulty,
+            "tags": problem_details.tags
+        }
+    }
+
+
+async def keep_note_sections(builder, files: dict) -> dict:
+    """`files` with the notes sections already on the branch but not in the new notes carried over.
+
+    A resubmit renders the notes from its own profile; without this it would drop the
+    sections added later through fill_note_section.
+    """
+    paths = [path for path in files if path.endswith(".md")]
+    previous = await asyncio.gather(*(builder.read_file(path) for path in paths))
+    files = dict(files)
+    for path, notes in zip(paths, previous):
+        if notes:
+            files[path] = keep_sections(notes, files[path])
+    return files
+
+
+async def push_files(
+    builder,
+    files: dict,
+    message: str,
+    checkpoint: Optional[Checkpoint] = None,
+    problems: Optional[dict] = None
+) -> dict:
+    """builder.commit_files with the commit checkpointed and on-demand notes sections kept.
+
+    If an earlier attempt already pushed these files to the same branch (and then died,
+    e.g. before its job was marked done), the recorded commit is returned instead of
+    committing again.
+    """
+    destination = f"{builder.owner}/{builder.repo}@{builder.branch}"
+    saved = checkpoint.stages.get("push") if checkpoint else None
+    if saved and saved["destination"] == destination and saved.get("paths") == sorted(files):
+        return checkpoint.get("push")
+    commit = await builder.commit_files(await keep_note_sections(builder, files), message, problems)
+    if checkpoint:
+        checkpoint.save("push", {**commit, "destination": destination, "paths": sorted(files)})
+    return commit
+
+
+async def process_submission(
+    llm_instance,
+    solution,
+    builder,
+    timings: Optional[dict] = None,
+    emit: Optional[Callable[[str, dict], None]] = None
+) -> dict:
+    """Full /save-solution pipeline: analyze, render and push code + notes in one commit.
+
+    When `emit` is given it is called with (event, data) as each stage produces output:
+    extraction, explanation_token, explanation, file_pushed. Stage outputs are
+    checkpointed under the submission, so resubmitting after a failure only reruns the
+    stages that didn't finish; the checkpoints are dropped once the submission succeeds.
+    """
+    streaming = emit is not None
+    sections = profile_sections(solution.note_profile)
+    checkpoint = open_checkpoint(
+        solution.problem_statement, solution.code, solution.language, solution.problem_name,
+        note_profile=solution.note_profile, fresh=solution.bypass_cache
+    )
+    logger.info("🔍 Extracting problem details and 📝 generating explanation...")
+    problem_details, explanation = await analyze_solution(
+        llm_instance,
+        solution.problem_statement,
+        solution.code,
+        solution.language,
+        bypass_cache=solution.bypass_cache,
+        timings=timings,
+        on_extracted=(lambda details: emit("extraction", details.dict())) if streaming else None,
+        on_token=(lambda text: emit("explanation_token", {"text": text})) if streaming else None,
+        problem_name=solution.problem_name,
+        checkpoint=checkpoint,
+        sections=sections
+    )
+    logger.info(f"✅ Problem extracted: {problem_details.problem_name}")
+    logger.info("✅ Explanation generated")
+    if streaming:
+        emit("explanation", explanation.dict())
+
+    async def render():
+        return render_solution_files(problem_details, explanation, solution.code, solution.language, checkpoint)
+
+    folder, files = await _run_stage("rendering", render(), timings)
+
+    logger.info(f"📤 Pushing {len(files)} files to solutions/{folder}/ in one commit")
+    commit = await _run_stage("push", push_files(
+        builder,
+        files,
+        f"Add solution: {problem_details.problem_name} ({solution.language})",
+        checkpoint,
+        folder_owner(folder, problem_details)
+    ), timings)
+    if commit["files"] or commit.get("manifest"):
+        logger.info(f"✅ Files pushed in commit {commit['commit_sha'][:7]}")
+    else:
+        logger.info("✅ All files unchanged, nothing to commit")
+    if streaming:
+        for path in commit["files"]:
+            emit("file_pushed", {"path": path, "commit_sha": commit["commit_sha"]})
+
+    result = {
+        "status": "success",
+        "problem": problem_details.dict(),
+        "files_pushed": commit["files"],
+        "files_unchanged": commit.get("unchanged", []),
+        # Index shards and generated pages, kept apart from the solution files
+        "manifest_updated": commit.get("manifest", []),
+        "folder_structure": f"solutions/{folder}/",
+        "note_sections": list(sections)
+    }
+    if checkpoint:
+        result["resumed"] = checkpoint.resumed
+        checkpoint.clear()
+    return result
+
+
+async def stream_submission(llm_instance, solution, builder) -> AsyncIterator[tuple]:
+    """Run process_submission and yield its (event, data) pairs as they happen.
+
+    A "started" event goes out immediately, then the stage events, then either
+    "result" or "error". Closing the generator cancels the pipeline.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    timings = {}
+
+    async def run():
+        try:
+            # Someone is watching this one live, so it jumps the rate-limit queue
+            with request_priority(PRIORITY_INTERACTIVE):
+                result = await process_submission(
+                    llm_instance, solution, builder, timings,
+                    emit=lambda event, data: events.put_nowait((event, data))
+                )
+            events.put_nowait(("result", {**result, "stages": timings}))
+        except StageError as e:
+            logger.error(f"❌ {e.describe()}")
+            events.put_nowait(("error", {"stage": e.stage, "detail": e.describe()}))
+        except Exception as e:
+            logger.error(str(e))
+            events.put_nowait(("error", {"stage": None, "detail": str(e)}))
+        finally:
+            events.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    try:
+        yield "started", {}
+        while (event := await events.get()) is not None:
+            yield event
+    finally:
+        task.cancel()
+
+
+# Tried in order when the manifest doesn't list a folder's files
+SOLUTION_LANGUAGES = ("python", "java", "cpp", "javascript", "typescript", "go", "rust", "c", "csharp", "swift", "sql")
+_SOLUTION_HEADER_RE = re.compile(r"# Solution - (\S+)\n\n")
+
+
+async def _note_folder(builder, problem: str) -> tuple:
+    """(folder, manifest entry) for a problem number or a solutions/ folder name"""
+    if not problem.isdigit() and (not problem or "/" in problem or problem.startswith(".")):
+        raise ValueError(f"Invalid problem folder {problem!r}")
+    path = shard_path(int(problem) if problem.isdigit() else folder_number(problem))
+    text = await builder.read_file(path)
+    if text is None:
+        # Repositories not migrated to index shards yet
+        path, text = LEGACY_MANIFEST_PATH, await builder.read_file(LEGACY_MANIFEST_PATH)
+    entries = load_manifest(text)["problems"]
+    if problem.isdigit():
+        for folder, entry in entries.items():
+            if entry.get("number") == int(problem):
+                return folder, entry
+        raise NoteNotFoundError(f"Problem {problem} isn't in {path}")
+    return problem, entries.get(problem, {})
+
+
+async def _solution_code(builder, folder: str, entry: dict, language: Optional[str]) -> tuple:
+    """(code, language) of a pushed solution, read back from its solution file"""
+    if language:
+        names = [f"{folder}.{get_file_extension(language)}"]
+    else:
+        names = [name for name in entry.get("files", []) if not name.endswith(".md")]
+        names = names or [f"{folder}.{get_file_extension(lang)}" for lang in SOLUTION_LANGUAGES]
+    for name in names:
+        content = await builder.read_file(f"solutions/{folder}/{name}")
+        if content is None:
+            continue
+        header = _SOLUTION_HEADER_RE.match(content)
+        if header is None:
+            return content, language or "text"
+        return content[header.end():].removesuffix("\n"), header.group(1).lower()
+    raise NoteNotFoundError(f"No solution file in solutions/{folder}/" + (f" for {language}" if language else ""))
+
+
+async def fill_note_section(
+    llm_instance,
+    builder,
+    problem: str,
+    section: str,
+    language: Optional[str] = None,
+    regenerate: bool = False
+) -> dict:
+    """Generate one notes section for an already pushed problem and commit it into its .md.
+
+    `problem` is a problem number (looked up in the solutions manifest) or a solutions/
+    folder name. The statement is read back from the notes and the code from the
+    `language` solution file (by default the first one found). A section that is
+    already there is left alone unless `regenerate`, which also skips the LLM cache.
+    """
+    if section not in NOTE_SECTIONS:
+        raise ValueError(f"Unknown notes section {section!r}; expected one of {', '.join(NOTE_SECTIONS)}")
+    folder, entry = await _note_folder(builder, problem)
+    notes_path = f"solutions/{folder}/{folder}.md"
+    notes = await builder.read_file(notes_path)
+    if notes is None:
+        raise NoteNotFoundError(f"No notes at {notes_path}")
+    if section in notes_sections(notes) and not regenerate:
+        return {"status": "unchanged", "section": section, "path": notes_path, "files_pushed": []}
+
+    code, language = await _solution_code(builder, folder, entry, language)
+    prompt, parser = prompts.explanation_chain((section,))
+    chain = CachedChain(prompt, llm_instance, parser, stage="explanation")
+
+    async def explain():
+        result = await chain.ainvoke({
+            "problem_statement": notes_problem_statement(notes) or entry.get("name", folder),
+            "code": code,
+            "language": language
+        }, bypass=regenerate)
+        return Explanation.model_validate(result.model_dump())
+
+    logger.info(f"📝 Generating {section} notes for solutions/{folder}/")
+    explanation = await _run_stage("explanation", explain())
+    commit = await _run_stage("push", builder.commit_files(
+        {notes_path: patch_notes(notes, section, explanation)},
+        f"Add {section} notes: {entry.get('name', folder)}"
+    ))
+    return {
+        "status": "success",
+        "section": section,
+        "path": notes_path,
+        "files_pushed": commit["files"],
+        "commit_sha": commit.get("commit_sha")
+    }
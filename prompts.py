@@ -1,166 +1,349 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from models import ProblemDetails, Explanation
-
-# PARSERS
-problem_parser = PydanticOutputParser(pydantic_object=ProblemDetails)
-explanation_parser = PydanticOutputParser(pydantic_object=Explanation)
-
-# PROMPTS
-problem_prompt = PromptTemplate(
-    template=(
-        "You are an expert LeetCode problem analyzer.\n"
-        "Extract and structure data from this problem statement:\n\n"
-        "{problem_statement}\n\n"
-        "IMPORTANT RULES:\n"
-        "1. Extract problem_number if it exists (e.g., 1, 2, 15, 121), else set to null\n"
-        "2. problem_name: Clean name only (e.g., 'Two Sum', 'Best Time to Buy and Sell Stock')\n"
-        "3. difficulty: Must be one of 'Easy', 'Medium', 'Hard'\n"
-        "4. tags: List of specific algorithmic tags (not generic). Examples:\n"
-        "   - 'Array', 'Hash Table', 'Dynamic Programming', 'Two Pointers', 'Greedy'\n"
-        "   - 'Binary Search', 'Graph', 'Tree', 'String', 'Stack', 'Queue'\n"
-        "   - 'Recursion', 'Backtracking', 'Divide and Conquer', 'Trie'\n"
-        "5. original_statement: Format this field with proper Markdown:\n"
-        "   - Write the problem description in clear, well-structured paragraphs\n"
-        "   - Use **bold** for important terms and constraints\n"
-        "   - Format examples properly with headers (### Example 1, ### Example 2, etc.)\n"
-        "   - Each example should have:\n"
-        "     - **Input:** followed by the input value\n"
-        "     - **Output:** followed by the output value\n"
-        "     - **Explanation:** followed by the explanation (if provided)\n"
-        "   - Format constraints section with a header (### Constraints) and bullet points\n"
-        "   - Use code formatting with backticks for values (e.g., `k = 1`, `n = 111`)\n"
-        "   - Ensure proper spacing and line breaks for readability\n"
-        "6. input_description: What does input represent (1-2 sentences)\n"
-        "7. output_description: What should be output (1-2 sentences)\n"
-        "8. examples: List with 'input' and 'output' fields (simple values only, not full explanations)\n\n"
-        "Format your response as JSON matching this schema:\n"
-        "{format_instructions}"
-    ),
-    input_variables=["problem_statement"],
-    partial_variables={"format_instructions": problem_parser.get_format_instructions()}
+from functools import lru_cache
+
+# TEMPLATES
+# Templates are plain strings; the langchain prompt and parser objects below are built
+# on first attribute access and cached, so importing this module stays cheap.
+
+PROBLEM_RULES = (
+    "1. Extract problem_number if it exists (e.g., 1, 2, 15, 121), else set to null\n"
+    "2. problem_name: Clean name only (e.g., 'Two Sum', 'Best Time to Buy and Sell Stock')\n"
+    "3. difficulty: Must be one of 'Easy', 'Medium', 'Hard'\n"
+    "4. tags: List of specific algorithmic tags (not generic). Examples:\n"
+    "   - 'Array', 'Hash Table', 'Dynamic Programming', 'Two Pointers', 'Greedy'\n"
+    "   - 'Binary Search', 'Graph', 'Tree', 'String', 'Stack', 'Queue'\n"
+    "   - 'Recursion', 'Backtracking', 'Divide and Conquer', 'Trie'\n"
+    "5. original_statement: Format this field with proper Markdown:\n"
+    "   - Write the problem description in clear, well-structured paragraphs\n"
+    "   - Use **bold** for important terms and constraints\n"
+    "   - Format examples properly with headers (### Example 1, ### Example 2, etc.)\n"
+    "   - Each example should have:\n"
+    "     - **Input:** followed by the input value\n"
+    "     - **Output:** followed by the output value\n"
+    "     - **Explanation:** followed by the explanation (if provided)\n"
+    "   - Format constraints section with a header (### Constraints) and bullet points\n"
+    "   - Use code formatting with backticks for values (e.g., `k = 1`, `n = 111`)\n"
+    "   - Ensure proper spacing and line breaks for readability\n"
+    "6. input_description: What does input represent (1-2 sentences)\n"
+    "7. output_description: What should be output (1-2 sentences)\n"
+    "8. examples: List with 'input' and 'output' fields (simple values only, not full explanations)\n\n"
+)
+
+
+PROBLEM_JUDGMENT_RULES = (
+    "1. problem_name: Clean name only (e.g., 'Two Sum', 'Best Time to Buy and Sell Stock')\n"
+    "2. difficulty: Must be one of 'Easy', 'Medium', 'Hard'\n"
+    "3. tags: List of specific algorithmic tags (not generic), e.g. 'Array', 'Hash Table',\n"
+    "   'Dynamic Programming', 'Two Pointers', 'Greedy', 'Binary Search', 'Graph', 'Trie'\n"
+    "4. input_description: What does input represent (1-2 sentences)\n"
+    "5. output_description: What should be output (1-2 sentences)\n\n"
+)
+
+
+# Notes sections in the order they appear in the .md, each with one or more numbered rules
+EXPLANATION_FORMATTING_RULE = (
+    "0. FORMATTING & TONE:\n"
+    "   - Use proper Markdown formatting for all text fields\n"
+    "   - Ensure the content is easy to read and understandable\n"
+    "   - Use headers, lists, and bold text effectively to improve readability\n\n"
+)
+
+EXPLANATION_SECTION_RULES = {
+    "explanation": [
+        (
+            "EXPLANATION (3-4 lines):\n"
+            "   - Clear, concise explanation of what the solution does\n"
+            "   - Explain the core insight\n"
+            "   - Use **bold** for key terms and concepts\n\n"
+        )
+    ],
+    "key_insights": [
+        (
+            "KEY INSIGHTS (3-5 insights):\n"
+            "   - Identify the core insights that make this problem solvable\n"
+            "   - Focus on the 'aha!' moments or critical observations\n"
+            "   - Each insight should be a complete, standalone statement\n"
+            "   - Use **bold** for the main concept in each insight\n"
+            "   - Examples of good insights:\n"
+            "     * 'The problem can be reduced to finding **remainders modulo k**'\n"
+            "     * 'Using **modular arithmetic** avoids overflow issues with large numbers'\n"
+            "     * 'If k is divisible by 2 or 5, no repunit can divide it (ends in 0, 2, 4, 5, 6, 8)'\n"
+            "     * 'By **Pigeonhole Principle**, we must find a cycle within k iterations'\n\n"
+        )
+    ],
+    "hints": [
+        (
+            "HINTS (5-6 hints):\n"
+            "   - Each hint should highlight a key concept\n"
+            "   - Use **bold** around important terms\n"
+            "   - Example: 'Use a **Hash Table** to store seen elements for O(1) lookup'\n\n"
+        )
+    ],
+    "algorithm": [
+        (
+            "ALGORITHM:\n"
+            "   - Write full pseudocode or algorithmic description\n"
+            "   - Use proper indentation for nested structures\n"
+            "   - Include loop structures, conditionals clearly\n"
+            "   - Format like:\n"
+            "     function solve(input):\n"
+            "       if condition:\n"
+            "         do something\n"
+            "       else:\n"
+            "         do other\n"
+            "       for item in collection:\n"
+            "         process item\n"
+            "       return result\n\n"
+        )
+    ],
+    "approach": [
+        (
+            "APPROACH (step by step list):\n"
+            "   - Each point is a logical step\n"
+            "   - Keep points concise but complete\n"
+            "   - Use **bold** for the main action in each step\n\n"
+        )
+    ],
+    "walkthrough": [
+        (
+            "WALKTHROUGH (with visual examples):\n"
+            "   - Create a highly visual, step-by-step execution trace\n"
+            "   - Use **bold** for step numbers and key actions\n"
+            "   - Format variable states using code blocks or tables\n"
+            "   - Use ASCII art for data structures:\n"
+            "     * Arrays: [1, 2, 3] with arrows → pointing to current element\n"
+            "     * Pointers: Use ↑ or ^ to show positions\n"
+            "     * Trees: Use simple ASCII tree structure\n"
+            "     * Stacks/Queues: Show vertical or horizontal boxes\n"
+            "   - Example format:\n"
+            "     **Step 1:** Initialize variables\n"
+            "     ```\n"
+            "     array = [1, 2, 3, 4]\n"
+            "             ↑\n"
+            "           left\n"
+            "     ```\n"
+            "     **Step 2:** Process element at index 0\n"
+            "     - Current value: `1`\n"
+            "     - Action taken: Add to hash map\n"
+            "     \n"
+            "   - Use tables for tracking multiple variables:\n"
+            "     | Step | Index | Value | HashMap | Result |\n"
+            "     |------|-------|-------|---------|--------|\n"
+            "     | 1    | 0     | 1     | {{1: 0}}  | []     |\n"
+            "     \n"
+            "   - Add visual separators between major steps (---)\n"
+            "   - Use emojis sparingly for clarity (✓ for success, ✗ for failure)\n"
+            "   - Include 'Before' and 'After' states for complex operations\n"
+        )
+    ],
+    "complexity": [
+        (
+            "TIME COMPLEXITY:\n"
+            "   - Give Big O notation\n"
+            "   - Explain why this complexity\n"
+            "   - Use **bold** for the final complexity (e.g., **O(n)**)\n"
+        ),
+        (
+            "SPACE COMPLEXITY:\n"
+            "   - Give Big O notation\n"
+            "   - Explain what data structures take space\n"
+            "   - Use **bold** for the final complexity (e.g., **O(n)**)\n"
+            "   - Example: 'O(n) - Hash table stores up to n elements'\n\n"
+        )
+    ],
+    "edge_cases": [
+        (
+            "EDGE CASES (specific edge cases):\n"
+            "   - List actual edge cases not generic ones\n"
+            "   - Example instead of 'empty array': 'Array of size 1', 'All negative numbers', 'Duplicate elements'\n"
+            "   - Include why each edge case is important\n\n"
+        )
+    ]
+}
+
+
+def explanation_rules(sections) -> str:
+    """The formatting rule plus the numbered rules of `sections`, in note order"""
+    rules = [EXPLANATION_FORMATTING_RULE]
+    for section, entries in EXPLANATION_SECTION_RULES.items():
+        if section in sections:
+            for entry in entries:
+                rules.append(f"{len(rules)}. {entry}")
+    return "".join(rules)
+
+
+PROBLEM_TEMPLATE = (
+    "You are an expert LeetCode problem analyzer.\n"
+    "Extract and structure data from this problem statement:\n\n"
+    "{problem_statement}\n\n"
+    "IMPORTANT RULES:\n"
+    + PROBLEM_RULES +
+    "Format your response as JSON matching this schema:\n"
+    "{format_instructions}"
+)
+
+# Used when utils.parse_problem_statement already recovered the examples and constraints
+PROBLEM_JUDGMENT_TEMPLATE = (
+    "You are an expert LeetCode problem analyzer.\n"
+    "Classify this problem statement (examples omitted):\n\n"
+    "{problem_statement}\n\n"
+    "IMPORTANT RULES:\n"
+    + PROBLEM_JUDGMENT_RULES +
+    "Format your response as JSON matching this schema:\n"
+    "{format_instructions}"
+)
+
+EXPLANATION_HEADER = (
+    "You are an expert coding educator.\n"
+    "Analyze this LeetCode problem and provide detailed learning material.\n\n"
+    "Problem:\n{problem_statement}\n\n"
+    "Solution Code ({language}):\n{code}\n\n"
+    "CRITICAL REQUIREMENTS:\n\n"
+)
+
+# Single-call mode: problem fields and learning material in one merged JSON object
+COMBINED_HEADER = (
+    "You are an expert LeetCode problem analyzer and coding educator.\n"
+    "Extract and structure data from this problem statement and provide detailed learning material\n"
+    "for the solution, as ONE JSON object holding both sets of fields.\n\n"
+    "Problem:\n{problem_statement}\n\n"
+    "Solution Code ({language}):\n{code}\n\n"
+    "PROBLEM FIELDS:\n"
+    + PROBLEM_RULES +
+    "LEARNING MATERIAL FIELDS:\n\n"
+)
+
+COMBINED_JUDGMENT_HEADER = (
+    "You are an expert LeetCode problem analyzer and coding educator.\n"
+    "Classify this problem statement and provide detailed learning material for the solution,\n"
+    "as ONE JSON object holding both sets of fields.\n\n"
+    "Problem:\n{problem_statement}\n\n"
+    "Solution Code ({language}):\n{code}\n\n"
+    "PROBLEM FIELDS:\n"
+    + PROBLEM_JUDGMENT_RULES +
+    "LEARNING MATERIAL FIELDS:\n\n"
 )
 
-explanation_prompt = PromptTemplate(
-    template=(
-        "You are an expert coding educator.\n"
-        "Analyze this LeetCode problem and provide detailed learning material.\n\n"
-        "Problem:\n{problem_statement}\n\n"
-        "Solution Code ({language}):\n{code}\n\n"
-        "CRITICAL REQUIREMENTS:\n\n"
-        "0. FORMATTING & TONE:\n"
-        "   - Use proper Markdown formatting for all text fields\n"
-        "   - Ensure the content is easy to read and understandable\n"
-        "   - Use headers, lists, and bold text effectively to improve readability\n\n"
-        "1. EXPLANATION (3-4 lines):\n"
-        "   - Clear, concise explanation of what the solution does\n"
-        "   - Explain the core insight\n"
-        "   - Use **bold** for key terms and concepts\n\n"
-        "2. KEY INSIGHTS (3-5 insights):\n"
-        "   - Identify the core insights that make this problem solvable\n"
-        "   - Focus on the 'aha!' moments or critical observations\n"
-        "   - Each insight should be a complete, standalone statement\n"
-        "   - Use **bold** for the main concept in each insight\n"
-        "   - Examples of good insights:\n"
-        "     * 'The problem can be reduced to finding **remainders modulo k**'\n"
-        "     * 'Using **modular arithmetic** avoids overflow issues with large numbers'\n"
-        "     * 'If k is divisible by 2 or 5, no repunit can divide it (ends in 0, 2, 4, 5, 6, 8)'\n"
-        "     * 'By **Pigeonhole Principle**, we must find a cycle within k iterations'\n\n"
-        "3. HINTS (5-6 hints):\n"
-        "   - Each hint should highlight a key concept\n"
-        "   - Use **bold** around important terms\n"
-        "   - Example: 'Use a **Hash Table** to store seen elements for O(1) lookup'\n\n"
-        "4. ALGORITHM:\n"
-        "   - Write full pseudocode or algorithmic description\n"
-        "   - Use proper indentation for nested structures\n"
-        "   - Include loop structures, conditionals clearly\n"
-        "   - Format like:\n"
-        "     function solve(input):\n"
-        "       if condition:\n"
-        "         do something\n"
-        "       else:\n"
-        "         do other\n"
-        "       for item in collection:\n"
-        "         process item\n"
-        "       return result\n\n"
-        "5. APPROACH (step by step list):\n"
-        "   - Each point is a logical step\n"
-        "   - Keep points concise but complete\n"
-        "   - Use **bold** for the main action in each step\n\n"
-        "6. WALKTHROUGH (with visual examples):\n"
-        "   - Create a highly visual, step-by-step execution trace\n"
-        "   - Use **bold** for step numbers and key actions\n"
-        "   - Format variable states using code blocks or tables\n"
-        "   - Use ASCII art for data structures:\n"
-        "     * Arrays: [1, 2, 3] with arrows → pointing to current element\n"
-        "     * Pointers: Use ↑ or ^ to show positions\n"
-        "     * Trees: Use simple ASCII tree structure\n"
-        "     * Stacks/Queues: Show vertical or horizontal boxes\n"
-        "   - Example format:\n"
-        "     **Step 1:** Initialize variables\n"
-        "     ```\n"
-        "     array = [1, 2, 3, 4]\n"
-        "             ↑\n"
-        "           left\n"
-        "     ```\n"
-        "     **Step 2:** Process element at index 0\n"
-        "     - Current value: `1`\n"
-        "     - Action taken: Add to hash map\n"
-        "     \n"
-        "   - Use tables for tracking multiple variables:\n"
-        "     | Step | Index | Value | HashMap | Result |\n"
-        "     |------|-------|-------|---------|--------|\n"
-        "     | 1    | 0     | 1     | {{1: 0}}  | []     |\n"
-        "     \n"
-        "   - Add visual separators between major steps (---)\n"
-        "   - Use emojis sparingly for clarity (✓ for success, ✗ for failure)\n"
-        "   - Include 'Before' and 'After' states for complex operations\n"
-        "7. TIME COMPLEXITY:\n"
-        "   - Give Big O notation\n"
-        "   - Explain why this complexity\n"
-        "   - Use **bold** for the final complexity (e.g., **O(n)**)\n"
-        "8. SPACE COMPLEXITY:\n"
-        "   - Give Big O notation\n"
-        "   - Explain what data structures take space\n"
-        "   - Use **bold** for the final complexity (e.g., **O(n)**)\n"
-        "   - Example: 'O(n) - Hash table stores up to n elements'\n\n"
-        "9. EDGE CASES (specific edge cases):\n"
-        "   - List actual edge cases not generic ones\n"
-        "   - Example instead of 'empty array': 'Array of size 1', 'All negative numbers', 'Duplicate elements'\n"
-        "   - Include why each edge case is important\n\n"
+
+def explanation_template(header: str, sections) -> str:
+    """`header`, then the rules for just `sections` of the notes, then the schema"""
+    return header + explanation_rules(sections) + (
         "Respond ONLY with valid JSON matching this schema:\n"
         "{format_instructions}"
-    ),
-    input_variables=["problem_statement", "code", "language"],
-    partial_variables={"format_instructions": explanation_parser.get_format_instructions()}
+    )
+
+
+ALL_SECTIONS = tuple(EXPLANATION_SECTION_RULES)
+
+TRANSLATION_TEMPLATE = (
+    "You are an expert polyglot programmer.\n"
+    "Translate the following {source_language} code to {target_language}.\n\n"
+    "Original Code:\n"
+    "```\n{code}\n```\n\n"
+    "Requirements:\n"
+    "1. Maintain the exact same logic and algorithm.\n"
+    "2. Use idiomatic syntax for {target_language}.\n"
+    "3. Keep variable names similar unless they violate {target_language} naming conventions.\n"
+    "4. Include necessary imports/headers.\n"
+    "5. Output ONLY the code, no markdown backticks, no explanation.\n"
 )
 
-translation_prompt = PromptTemplate(
-    template=(
-        "You are an expert polyglot programmer.\n"
-        "Translate the following {source_language} code to {target_language}.\n\n"
-        "Original Code:\n"
-        "```\n{code}\n```\n\n"
-        "Requirements:\n"
-        "1. Maintain the exact same logic and algorithm.\n"
-        "2. Use idiomatic syntax for {target_language}.\n"
-        "3. Keep variable names similar unless they violate {target_language} naming conventions.\n"
-        "4. Include necessary imports/headers.\n"
-        "5. Output ONLY the code, no markdown backticks, no explanation.\n"
-    ),
-    input_variables=["source_language", "target_language", "code"]
+CHAT_TEMPLATE = (
+    "You are an expert coding tutor.\n"
+    "You are discussing a LeetCode problem solution with a student.\n\n"
+    "Problem Context:\n{problem_statement}\n\n"
+    "{solution_context}\n\n"
+    "{history}"
+    "Student Question: {question}\n\n"
+    "Answer the student's question clearly and concisely.\n"
+    "If they ask about a specific part of the code, reference line numbers or code snippets.\n"
+    "Be encouraging and helpful."
 )
 
-chat_prompt = PromptTemplate(
-    template=(
-        "You are an expert coding tutor.\n"
-        "You are discussing a LeetCode problem solution with a student.\n\n"
-        "Problem Context:\n{problem_statement}\n\n"
-        "Current Solution ({language}):\n```\n{code}\n```\n\n"
-        "Student Question: {question}\n\n"
-        "Answer the student's question clearly and concisely.\n"
-        "If they ask about a specific part of the code, reference line numbers or code snippets.\n"
-        "Be encouraging and helpful."
-    ),
-    input_variables=["problem_statement", "language", "code", "question"]
+SUMMARY_TEMPLATE = (
+    "You maintain a running summary of a tutoring conversation about a LeetCode solution.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "Older turns to fold in:\n{turns}\n\n"
+    "Write an updated summary in at most 120 words.\n"
+    "Keep the student's questions, the key answers and any conclusions reached.\n"
+    "Output ONLY the summary text."
 )
+
+# LAZY PROMPTS + PARSERS
+def _problem_parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+    from models import ProblemDetails
+    return PydanticOutputParser(pydantic_object=ProblemDetails)
+
+
+def _problem_judgment_parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+    from models import ProblemJudgment
+    return PydanticOutputParser(pydantic_object=ProblemJudgment)
+
+
+def _prompt(template: str, input_variables: list, parser_name: str = None, parser=None):
+    from langchain_core.prompts import PromptTemplate
+    partial_variables = {}
+    if parser_name:
+        parser = _get(parser_name)
+    if parser is not None:
+        partial_variables["format_instructions"] = parser.get_format_instructions()
+    return PromptTemplate(
+        template=template,
+        input_variables=input_variables,
+        partial_variables=partial_variables
+    )
+
+
+_BUILDERS = {
+    "problem_parser": _problem_parser,
+    "problem_judgment_parser": _problem_judgment_parser,
+    "explanation_parser": lambda: explanation_chain(ALL_SECTIONS)[1],
+    "problem_prompt": lambda: _prompt(PROBLEM_TEMPLATE, ["problem_statement"], "problem_parser"),
+    "problem_judgment_prompt": lambda: _prompt(
+        PROBLEM_JUDGMENT_TEMPLATE, ["problem_statement"], "problem_judgment_parser"
+    ),
+    "explanation_prompt": lambda: explanation_chain(ALL_SECTIONS)[0],
+    "translation_prompt": lambda: _prompt(TRANSLATION_TEMPLATE, ["source_language", "target_language", "code"]),
+    "chat_prompt": lambda: _prompt(CHAT_TEMPLATE, ["problem_statement", "solution_context", "history", "question"]),
+    "summary_prompt": lambda: _prompt(SUMMARY_TEMPLATE, ["summary", "turns"]),
+}
+
+
+@lru_cache(maxsize=None)
+def explanation_chain(sections: tuple, kind: str = "explanation") -> tuple:
+    """(prompt, parser) asking only for `sections` of the notes.
+
+    kind "combined" adds the ProblemDetails fields and "combined_judgment" the
+    ProblemJudgment fields, for single-call analysis.
+    """
+    from langchain_core.output_parsers import PydanticOutputParser
+    from models import ProblemDetails, ProblemJudgment, explanation_model
+    from notes import section_fields
+    header, base, name, doc = {
+        "explanation": (EXPLANATION_HEADER, None, "Explanation", None),
+        "combined": (
+            COMBINED_HEADER, ProblemDetails, "CombinedAnalysis",
+            "ProblemDetails and Explanation fields in one object, for single-call analysis"
+        ),
+        "combined_judgment": (
+            COMBINED_JUDGMENT_HEADER, ProblemJudgment, "CombinedJudgment",
+            "ProblemJudgment and Explanation fields in one object, for single-call analysis"
+        )
+    }[kind]
+    model = explanation_model(section_fields(sections), base, name, doc)
+    parser = PydanticOutputParser(pydantic_object=model)
+    prompt = _prompt(explanation_template(header, sections), ["problem_statement", "code", "language"], parser=parser)
+    return prompt, parser
+
+
+def _get(name: str):
+    if name not in globals():
+        globals()[name] = _BUILDERS[name]()
+    return globals()[name]
+
+
+def __getattr__(name: str):
+    if name in _BUILDERS:
+        return _get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
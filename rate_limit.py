@@ -0,0 +1,248 @@
+import os
+import re
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# RATE LIMIT SETTINGS
+# Per-upstream quotas; 0 disables that bucket (response headers and 429s are still honoured).
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+GITHUB_RPM = float(os.getenv("GITHUB_RPM", "80"))
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "5"))
+RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", "1"))
+RATE_LIMIT_MAX_DELAY = float(os.getenv("RATE_LIMIT_MAX_DELAY", "60"))
+
+# PRIORITIES (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("rate_limit_priority", default=PRIORITY_NORMAL)
+
+_POLL_INTERVAL = 0.05
+_RETRY_IN_RE = re.compile(r"retry(?:_delay| in|Delay)[^0-9]{0,20}([\d.]+)\s*s", re.IGNORECASE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Queue every rate-limited call made inside the block (and tasks it spawns) at `priority`"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate (~4 characters per token) so counting never costs an API call"""
+    return (len(text) + 3) // 4
+
+
+def backoff_delay(attempt: int, base: float = RATE_LIMIT_BASE_DELAY, cap: float = RATE_LIMIT_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_from_headers(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait according to Retry-After or an exhausted X-RateLimit-* window"""
+    now = time.time() if now is None else now
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - now)
+            except (TypeError, ValueError):
+                pass
+    if headers.get("x-ratelimit-remaining") == "0" and headers.get("x-ratelimit-reset"):
+        try:
+            return max(0.0, float(headers["x-ratelimit-reset"]) - now)
+        except ValueError:
+            pass
+    return None
+
+
+def retry_after_from_error(error: Exception) -> Optional[float]:
+    """Return the suggested delay if `error` is a rate-limit error (0.0 when none is given), else None"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    text = str(error)
+    if status != 429 and "429" not in text and "RESOURCE_EXHAUSTED" not in text.upper():
+        return None
+    match = _RETRY_IN_RE.search(text)
+    return float(match.group(1)) if match else 0.0
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; may go negative when usage is settled late"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        if self.level >= min(cost, self.capacity):
+            return 0.0
+        return (min(cost, self.capacity) - self.level) / self.rate
+
+
+class RateLimiter:
+    """Token-bucket scheduler for one upstream with a priority queue and adaptive backoff.
+
+    Callers wait in (priority, arrival) order for a request slot and, optionally, for
+    their estimated token cost. When the upstream throttles, the whole limiter pauses
+    for the advertised Retry-After (or a jittered backoff) and the request rate is
+    halved, then creeps back up to the configured quota on each success.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = RATE_LIMIT_RETRIES
+    ):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self._requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        self._scale = 1.0
+        self._paused_until = 0.0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled = 0
+
+    def _try_acquire(self, ticket: tuple, cost: float) -> float:
+        """Take a slot if `ticket` is first in line; return 0.0 on success, else seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self._waiters[0] != ticket:
+                return max(wait, _POLL_INTERVAL)
+            if wait > 0:
+                return wait
+            for bucket, units in ((self._requests, 1), (self._tokens, cost)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(units))
+            if wait > 0:
+                return wait
+            for bucket, units in ((self._requests, 1), (self._tokens, cost)):
+                if bucket is not None:
+                    bucket.level -= units
+            heapq.heappop(self._waiters)
+            self.granted += 1
+            return 0.0
+
+    def _enqueue(self) -> tuple:
+        ticket = (_priority.get(), next(self._seq))
+        with self._lock:
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _abandon(self, ticket: tuple):
+        with self._lock:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+
+    async def acquire(self, tokens: float = 0):
+        """Wait for a request slot (and `tokens` of TPM budget) in priority order"""
+        ticket = self._enqueue()
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def acquire_sync(self, tokens: float = 0):
+        """Blocking acquire for synchronous callers such as the Streamlit chat"""
+        ticket = self._enqueue()
+        try:
+            while (wait := self._try_acquire(ticket, tokens)) > 0:
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def record_success(self):
+        if self._scale < 1.0:
+            with self._lock:
+                self._scale = min(1.0, self._scale + 0.1)
+                self._apply_scale()
+
+    def record_throttle(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Pause the limiter after a throttled response and return how long to wait before retrying"""
+        delay = retry_after if retry_after else backoff_delay(attempt)
+        with self._lock:
+            self.throttled += 1
+            self._scale = max(0.1, self._scale / 2)
+            self._apply_scale()
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        logger.warning(f"🐢 {self.name} rate limited, retrying in {delay:.1f}s (attempt {attempt + 1})")
+        return delay
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds`, e.g. when X-RateLimit-Remaining hits 0"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _apply_scale(self):
+        for bucket, per_minute in ((self._requests, self.requests_per_minute), (self._tokens, self.tokens_per_minute)):
+            if bucket is not None:
+                bucket.rate = per_minute * self._scale / 60
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "effective_rate": round(self._scale, 2),
+                "queued": len(self._waiters),
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                "granted": self.granted,
+                "throttled": self.throttled
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+_DEFAULTS = {
+    "gemini": lambda: RateLimiter("gemini", GEMINI_RPM, GEMINI_TPM),
+    "github": lambda: RateLimiter("github", GITHUB_RPM)
+}
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """Return the process-wide limiter for an upstream ("gemini" or "github")"""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = _DEFAULTS[name]() if name in _DEFAULTS else RateLimiter(name)
+        return _limiters[name]
+
+
+def limiter_stats() -> dict:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,195 @@
+import os
+import json
+import logging
+import threading
+from typing import Dict, Optional
+from catalog import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# REPO INDEX SETTINGS
+REPO_INDEX_ENABLED = os.getenv("REPO_INDEX_ENABLED", "1") != "0"
+REPO_INDEX_DIR = os.getenv("REPO_INDEX_DIR", ".cache/repo_index")
+REPO_INDEX_PREFIX = "solutions/"
+
+
+class FolderCollisionError(Exception):
+    """Raised when a different problem already owns the folder a submission maps to"""
+
+    def __init__(self, folder: str, existing: dict, incoming: dict):
+        super().__init__(
+            f"{folder} already holds '{_describe(existing)}', refusing to overwrite it with "
+            f"'{_describe(incoming)}'. Set a distinct problem name to store it separately."
+        )
+        self.folder = folder
+        self.existing = existing
+        self.incoming = incoming
+
+
+def _describe(problem: dict) -> str:
+    number = problem.get("problem_number")
+    return f"{number}. {problem['problem_name']}" if number else problem["problem_name"]
+
+
+def same_problem(a: dict, b: dict) -> bool:
+    """Same problem number and normalised name"""
+    return (
+        a.get("problem_number") == b.get("problem_number")
+        and normalize_name(a["problem_name"]) == normalize_name(b["problem_name"])
+    )
+
+
+class RepoIndex:
+    """In-memory + on-disk index of the blobs under solutions/ on one branch.
+
+    The index reflects one commit (`head`). Every refresh checks the branch ref with
+    If-None-Match, so an unchanged branch costs a 304 (which GitHub doesn't count against
+    the rate limit), and the tree is only refetched, with a single recursive call, once
+    the branch has moved. Existence checks and SHA lookups are then answered from memory
+    and are never older than the last refresh. The index also remembers which problem
+    each folder was pushed for, to catch two problems mapping to the same folder.
+    """
+
+    def __init__(self, owner: str, repo: str, branch: str = "main", directory: str = REPO_INDEX_DIR):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.path = os.path.join(directory, f"{owner}__{repo}__{branch}.json".replace("/", "_"))
+        self.head: Optional[str] = None
+        self.ref_etag: Optional[str] = None
+        self.files: Dict[str, str] = {}
+        self.owners: Dict[str, dict] = {}
+        self.complete = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.head = data.get("head")
+        self.ref_etag = data.get("ref_etag")
+        self.files = data.get("files", {})
+        self.owners = data.get("owners", {})
+        # Indexes saved before heads were tracked can't be matched to a commit
+        self.complete = data.get("complete", False) and "head" in data
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "head": self.head,
+                "ref_etag": self.ref_etag,
+                "files": self.files,
+                "owners": self.owners,
+                "complete": self.complete
+            }, f)
+        os.replace(tmp, self.path)
+
+    async def refresh(self, client, force: bool = False) -> bool:
+        """Bring the index up to the branch head; returns False if it can't be trusted"""
+        headers = {"If-None-Match": self.ref_etag} if self.ref_etag and not force else {}
+        r = await client.request(
+            "GET", f"/repos/{self.owner}/{self.repo}/git/ref/heads/{self.branch}", headers=headers
+        )
+        if r.status_code == 304:
+            head = self.head
+        elif r.status_code in (404, 409):
+            # Branch or repository doesn't exist yet
+            head = None
+        elif r.status_code == 200:
+            head = r.json()["object"]["sha"]
+            self.ref_etag = r.headers.get("etag")
+        else:
+            logger.warning(f"⚠️ Repo index refresh failed ({r.status_code}), using per-folder lookups")
+            self.complete = False
+            return False
+        if self.complete and head == self.head and not force:
+            return True
+
+        files, complete = {}, True
+        if head is not None:
+            r = await client.request(
+                "GET", f"/repos/{self.owner}/{self.repo}/git/trees/{head}", params={"recursive": "1"}
+            )
+            if r.status_code != 200:
+                logger.warning(f"⚠️ Repo index refresh failed ({r.status_code}), using per-folder lookups")
+                self.complete = False
+                return False
+            body = r.json()
+            files = {
+                e["path"]: e["sha"] for e in body["tree"]
+                if e["type"] == "blob" and e["path"].startswith(REPO_INDEX_PREFIX)
+            }
+            # Trees over GitHub's size limit come back truncated; fall back to per-folder listings
+            complete = not body.get("truncated", False)
+        with self._lock:
+            self.head, self.files, self.complete = head, files, complete
+            self._save()
+        logger.info(f"🗂️ Repo index for {self.owner}/{self.repo}@{self.branch}: {len(self.files)} files")
+        return self.complete
+
+    def exists(self, path: str) -> bool:
+        return path in self.files
+
+    def sha(self, path: str) -> Optional[str]:
+        return self.files.get(path)
+
+    def folder_exists(self, folder: str) -> bool:
+        prefix = folder.rstrip("/") + "/"
+        return any(path.startswith(prefix) for path in self.files)
+
+    def check_collision(self, folder: str, problem: dict):
+        """Raise FolderCollisionError if `folder` was pushed for a different problem"""
+        existing = self.owners.get(folder)
+        if existing and self.folder_exists(folder) and not same_problem(existing, problem):
+            raise FolderCollisionError(folder, existing, problem)
+
+    def record_commit(
+        self,
+        shas: Dict[str, str],
+        problems: Optional[Dict[str, dict]] = None,
+        head: Optional[str] = None
+    ):
+        """Apply a commit we just made, so lookups stay exact without another tree fetch.
+
+        `head` is the new commit; without it the index can't tell whether the branch has
+        moved again since, so the next refresh refetches the tree. A None sha marks a
+        deleted path.
+        """
+        with self._lock:
+            for path, sha in shas.items():
+                if not path.startswith(REPO_INDEX_PREFIX):
+                    continue
+                if sha is None:
+                    self.files.pop(path, None)
+                else:
+                    self.files[path] = sha
+            for folder, problem in (problems or {}).items():
+                self.owners[folder] = {
+                    "problem_number": problem.get("problem_number"),
+                    "problem_name": problem["problem_name"]
+                }
+            if shas:
+                self.head = head
+                if head is None:
+                    self.complete = False
+            self._save()
+
+
+_indexes: Dict[tuple, RepoIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_repo_index(owner: str, repo: str, branch: str = "main") -> Optional[RepoIndex]:
+    """Return the shared index for a branch, or None when REPO_INDEX_ENABLED=0"""
+    if not REPO_INDEX_ENABLED:
+        return None
+    key = (owner, repo, branch)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = RepoIndex(owner, repo, branch)
+        return _indexes[key]
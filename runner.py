@@ -0,0 +1,23 @@
+import asyncio
+import threading
+from typing import Optional
+
+# Streamlit runs each script rerun synchronously, so async work (pooled GitHub client,
+# concurrent LLM chains) is handed to one long-lived event loop on a daemon thread.
+# Keeping the loop alive across reruns is what lets keep-alive connections be reused.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True).start()
+    return _loop
+
+
+def run_async(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the background loop and block until it finishes"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
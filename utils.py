@@ -1,7 +1,9 @@
 import re
+import hashlib
 from typing import Optional
 from datetime import datetime
 from models import ProblemDetails, Explanation
+from notes import EXAMPLES_HEADING, present_sections, render_section
 
 def extract_problem_number(problem_name: str, problem_number: Optional[int]) -> tuple:
     """Extract problem number from name or use provided number"""
@@ -14,6 +16,131 @@ def extract_problem_number(problem_name: str, problem_number: Optional[int]) ->
     
     return None, problem_name
 
+# STATEMENT PRE-PARSER
+# Pulls the mechanical parts of a pasted LeetCode statement (title, difficulty, examples,
+# constraints) out locally so the extraction LLM call only has to fill in judgment fields.
+_EXAMPLE_RE = re.compile(r"^\W*example\s*(\d+)?\W*$", re.IGNORECASE)
+_CONSTRAINTS_RE = re.compile(r"^\W*constraints\W*$", re.IGNORECASE)
+_FOLLOW_UP_RE = re.compile(r"^\W*follow[\s-]*up\W*:?\s*(.*)$", re.IGNORECASE)
+_EXAMPLE_FIELD_RE = re.compile(r"^\W*(input|output|explanation)\W*?:\**\s*(.*)$", re.IGNORECASE)
+# A Note: or Hint 1: header ends the example it follows; other "Word N:" lines
+# ("Step 1:", "Day 2:") stay part of the example's explanation
+_HEADER_RE = re.compile(r"^\W*(?:notes?|hints?)\s*\d*\W*?:", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+\.)\s+")
+_DIFFICULTIES = {"easy": "Easy", "medium": "Medium", "hard": "Hard"}
+
+def parse_problem_statement(statement: str) -> Optional[dict]:
+    """Rule-based parse of a standard LeetCode statement.
+
+    Returns {problem_number, problem_name, difficulty, description, examples, constraints,
+    follow_up} with missing parts left as None/empty, or None when no Example block with
+    both Input and Output is found and the text is better left to the LLM.
+
+    >>> parse_problem_statement("Example 1:\\nInput: n = 1\\nOutput: 2\\nNote: n is positive")["examples"][0]["output"]
+    '2'
+    >>> parse_problem_statement("Example 1:\\nInput: n = 1\\nOutput: 2\\nExplanation:\\nStep 1: add one")["examples"][0]["explanation"]
+    'Step 1: add one'
+    """
+    lines = [line.rstrip() for line in statement.strip().splitlines()]
+    parsed = {
+        "problem_number": None,
+        "problem_name": None,
+        "difficulty": None,
+        "description": "",
+        "examples": [],
+        "constraints": [],
+        "follow_up": None
+    }
+
+    # Title ("1. Two Sum") and an optional difficulty line right below it
+    if lines:
+        number, name = extract_problem_number(lines[0], None)
+        if number is not None:
+            parsed["problem_number"], parsed["problem_name"] = number, name
+            lines.pop(0)
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if lines and lines[0].strip().lower() in _DIFFICULTIES:
+        parsed["difficulty"] = _DIFFICULTIES[lines.pop(0).strip().lower()]
+
+    section, description, example, field = "description", [], None, None
+    for line in lines:
+        text = line.strip()
+        follow_up = _FOLLOW_UP_RE.match(text)
+        if _EXAMPLE_RE.match(text):
+            section, field = "example", None
+            example = {"input": "", "output": "", "explanation": ""}
+            parsed["examples"].append(example)
+        elif _CONSTRAINTS_RE.match(text):
+            section = "constraints"
+        elif follow_up:
+            section = "follow_up"
+            parsed["follow_up"] = follow_up.group(1).strip()
+        elif section == "description":
+            description.append(line)
+        elif not text:
+            continue
+        elif section == "example":
+            match = _EXAMPLE_FIELD_RE.match(text)
+            if match:
+                field = match.group(1).lower()
+                example[field] = match.group(2).strip().strip("`")
+            elif _HEADER_RE.match(text):
+                # e.g. a Note after the last example: it belongs to the statement text
+                section, field = "description", None
+                description.append(line)
+            elif field:
+                # Multi-line values (long inputs, wrapped explanations)
+                example[field] = f"{example[field]} {text}".strip()
+        elif section == "constraints":
+            parsed["constraints"].append(_BULLET_RE.sub("", text).strip("`"))
+        else:
+            parsed["follow_up"] = f"{parsed['follow_up']} {text}".strip()
+
+    parsed["examples"] = [e for e in parsed["examples"] if e["input"] and e["output"]]
+    if not parsed["examples"]:
+        return None
+    parsed["description"] = "\n".join(description).strip()
+    return parsed
+
+def strip_examples(statement: str) -> str:
+    """The statement without its Example blocks, for prompts that don't need them"""
+    kept, skipping = [], False
+    for line in statement.splitlines():
+        text = line.strip()
+        if _EXAMPLE_RE.match(text):
+            skipping = True
+        elif _CONSTRAINTS_RE.match(text) or _FOLLOW_UP_RE.match(text):
+            skipping = False
+        elif skipping and _HEADER_RE.match(text):
+            skipping = False
+        if not skipping:
+            kept.append(line)
+    return "\n".join(kept).strip()
+
+def format_problem_statement(parsed: dict) -> str:
+    """Markdown original_statement built from parse_problem_statement output"""
+    parts = [parsed["description"]] if parsed["description"] else []
+
+    for i, example in enumerate(parsed["examples"], 1):
+        block = f"### Example {i}\n**Input:** `{example['input']}`\n\n**Output:** `{example['output']}`"
+        if example["explanation"]:
+            block += f"\n\n**Explanation:** {example['explanation']}"
+        parts.append(block)
+
+    if parsed["constraints"]:
+        # Code-format the numeric bounds, leave prose constraints as they are
+        bullets = [
+            f"- `{c}`" if re.search(r"[<>=≤≥]", c) else f"- {c}"
+            for c in parsed["constraints"]
+        ]
+        parts.append("### Constraints\n" + "\n".join(bullets))
+
+    if parsed["follow_up"]:
+        parts.append(f"**Follow-up:** {parsed['follow_up']}")
+
+    return "\n\n".join(parts)
+
 def get_file_extension(language: str) -> str:
     extensions = {
         "python": "py",
@@ -73,72 +200,13 @@ def create_notes(problem: ProblemDetails, explanation: Explanation) -> str:
 ---
 
 
-## 💡 Explanation
-
-{explanation.explanation}
-
----
-
-## 🔑 Key Insights
-
-"""
-    
-    for i, insight in enumerate(explanation.key_insights, 1):
-        notes += f"{i}. {insight}\n"
-
-    notes += f"""
----
-
-## 🎯 Hints
-
-"""
-    
-    for i, hint in enumerate(explanation.hints, 1):
-        notes += f"{i}. {hint}\n"
-
-    notes += f"""
----
-
-## 🔍 Algorithm
-
-```
-{explanation.algorithm}
-```
-
----
-
-## 📋 Approach
-
 """
-    for i, step in enumerate(explanation.approach, 1):
-        notes += f"{i}. {step}\n"
-
-    notes += f"""
----
-
-## 🚶 Step-by-Step Walkthrough
-
-{explanation.walkthrough}
-
----
 
-## 📊 Complexity Analysis
+    # Sections left out of the note profile are skipped; fill_note_section adds them later
+    for section in present_sections(explanation):
+        notes += render_section(section, explanation)
 
-### Time Complexity
-{explanation.time_complexity}
-
-### Space Complexity
-{explanation.space_complexity}
-
----
-
-## ⚠️ Edge Cases
-
-"""
-    for edge_case in explanation.edge_cases:
-        notes += f"- {edge_case}\n"
-
-    notes += f"\n---\n\n## 📥 Examples\n\n"
+    notes += f"{EXAMPLES_HEADING}\n\n"
     
     for i, example in enumerate(problem.examples, 1):
         notes += f"### Example {i}\n"
@@ -148,3 +216,14 @@ def create_notes(problem: ProblemDetails, explanation: Explanation) -> str:
     notes += f"---\n*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
     
     return notes
+
+_GENERATED_LINE_RE = re.compile(r"^\*Generated on [^*]*\*$", re.MULTILINE)
+
+def git_blob_sha(content: str) -> str:
+    """The SHA git (and GitHub) assigns to a file with this content"""
+    data = content.encode()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def same_content(old: str, new: str) -> bool:
+    """Compare generated files, ignoring the "Generated on" timestamp in notes"""
+    return _GENERATED_LINE_RE.sub("", old) == _GENERATED_LINE_RE.sub("", new)